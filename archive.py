@@ -0,0 +1,73 @@
+import os
+from datetime import date, timedelta
+from sqlalchemy import text
+import cache
+import dates
+from database import bump_version
+
+# Shows stay in events for a few days after they happen, so a late correction
+# from /theking still lands on the live row, then move to events_archive
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "3"))
+
+COLUMNS = ("tm_id", "date_time", "name", "venue_name", "ticket_url", "source", "venue_key", "provenance", "expired_at")
+
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def ensure_partitions(conn, months):
+    # One partition per calendar month, created before rows for it are moved;
+    # a month already holding rows in the default partition stays there
+    for month in sorted(months):
+        name = f"events_archive_{month:%Y_%m}"
+        try:
+            with conn.begin_nested():
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF events_archive "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"))
+        except Exception as e:
+            print(f"Archive partition {name} not created, rows go to the default partition: {e}")
+
+
+def archive_past(engine, today=None):
+    # Moves every event older than the cutoff into events_archive in one
+    # transaction; re-archiving a row (a past show pasted again) overwrites it
+    today = today or dates.atl_today()
+    cutoff = today - timedelta(days=ARCHIVE_AFTER_DAYS)
+    cols = ", ".join(COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNS[2:] + ("archived_at",))
+    params = {"cutoff": cutoff, "today": today}
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            months = {_month_start(d) for d in conn.execute(text(
+                "SELECT DISTINCT date_trunc('month', date_time)::date FROM events WHERE date_time < :cutoff"), params).scalars()}
+            if not months:
+                return 0
+            ensure_partitions(conn, months)
+            moved = conn.execute(text(f"""
+                WITH moved AS (DELETE FROM events WHERE date_time < :cutoff RETURNING {cols})
+                INSERT INTO events_archive ({cols}, archived_at) SELECT {cols}, :today FROM moved
+                ON CONFLICT (tm_id, date_time) DO UPDATE SET {updates}"""), params).rowcount
+        else:
+            conn.execute(text(f"""
+                INSERT INTO events_archive ({cols}, archived_at) SELECT {cols}, :today FROM events WHERE date_time < :cutoff
+                ON CONFLICT (tm_id, date_time) DO UPDATE SET {updates}"""), params)
+            moved = conn.execute(text("DELETE FROM events WHERE date_time < :cutoff"), params).rowcount
+        if moved:
+            version = bump_version(conn)
+    if moved:
+        print(f"Archived {moved} events before {cutoff}")
+        cache.set_data_version(*version)
+    return moved
+
+
+if __name__ == "__main__":
+    from database import engine
+    import migrations
+    migrations.migrate(engine)
+    archive_past(engine)
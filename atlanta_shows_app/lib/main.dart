@@ -33,6 +33,11 @@ class Show {
 }
 
 // --- Fetching Logic ---
+// Validators from the last good response; /events answers 304 while the
+// schedule is unchanged, so a refresh doesn't download it again
+String _eventsEtag;
+List<Show> _lastShows = [];
+
 Future<List<Show>> fetchShows() async {
   // Check the URL for validity before trying to parse
   if (API_BASE_URL
@@ -44,14 +49,21 @@ Future<List<Show>> fetchShows() async {
   String errorDetails = 'Unknown error.';
 
   try {
-    final response = await http.get(apiUrl);
+    final response = await http.get(apiUrl,
+        headers: _eventsEtag == null ? {} : {'If-None-Match': _eventsEtag});
+
+    if (response.statusCode == 304) {
+      return _lastShows;
+    }
 
     if (response.statusCode == 200) {
       // The server is running and returned data
       List jsonList = jsonDecode(response.body);
       // Ensure the response is a list before mapping
       if (jsonList is List) {
-        return jsonList.map((data) => Show.fromJson(data)).toList();
+        _lastShows = jsonList.map((data) => Show.fromJson(data)).toList();
+        _eventsEtag = response.headers['etag'];
+        return _lastShows;
       } else {
         errorDetails = 'Server returned a single object, expected a list.';
         throw Exception(errorDetails);
@@ -10,9 +10,14 @@ class ShowApiService {
   final String _baseUrl =
       'https://atlantashows-production.up.railway.app/events';
 
+  // Last good response; the server answers 304 while the schedule is unchanged
+  String? _etag;
+  List<Show> _cachedShows = [];
+
   Future<List<Show>> fetchShows() async {
     final uri = Uri.parse(_baseUrl);
-    final response = await http.get(uri);
+    final response = await http.get(uri,
+        headers: _etag == null ? null : {'If-None-Match': _etag!});
 
     // --- DEBUGGING LOGS ---
     // Use log() instead of print() for better output in Flutter
@@ -21,6 +26,10 @@ class ShowApiService {
     log('Response Body: ${response.body}');
     // ----------------------
 
+    if (response.statusCode == 304) {
+      return _cachedShows;
+    }
+
     if (response.statusCode == 200) {
       // If the body is "No upcoming events found.", it's not a valid list.
       if (response.body.contains("No upcoming events found")) {
@@ -32,7 +41,7 @@ class ShowApiService {
       final List<dynamic> jsonList = jsonDecode(response.body);
 
       // Map the raw JSON objects to our simple Show model
-      return jsonList.map((showJson) {
+      final shows = jsonList.map((showJson) {
         // ... (Parsing logic remains the same for now) ...
         final String rawDate = showJson['date'] ??
             showJson['event_date'] ??
@@ -50,6 +59,9 @@ class ShowApiService {
           imageUrl: showJson['imageUrl'] ?? showJson['image_url'] ?? '',
         );
       }).toList();
+      _etag = response.headers['etag'];
+      _cachedShows = shows;
+      return shows;
     } else {
       // Handle the server error (e.g., if the server is down or returns a 404/500)
       throw Exception(
@@ -0,0 +1,131 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+from urllib.parse import urlparse
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))
+BROWSER_PER_VENUE = int(os.getenv("BROWSER_PER_VENUE", "1"))
+
+# We only read inline application/ld+json scripts, so skip everything heavy
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "adnxs.com", "amazon-adsystem.com", "facebook.net", "facebook.com",
+    "scorecardresearch.com", "hotjar.com", "criteo.com", "taboola.com", "outbrain.com",
+    "quantserve.com", "rubiconproject.com", "pubmatic.com", "moatads.com", "segment.io",
+)
+
+
+def _blocked(request):
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request.url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in BLOCKED_HOSTS)
+
+
+class BrowserPool:
+    # One long-lived Chromium on its own event-loop thread. Callers on any thread
+    # borrow a fresh, isolated context through run(); contexts are capped overall
+    # and per venue so several venues can scrape side by side.
+    def __init__(self, max_contexts=BROWSER_MAX_CONTEXTS, per_venue=BROWSER_PER_VENUE):
+        self.max_contexts = max_contexts
+        self.per_venue = per_venue
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._contexts = None
+        self._venues = {}
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._launch(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                raise
+            self._loop, self._thread = loop, thread
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._contexts = asyncio.Semaphore(self.max_contexts)
+
+    async def _route(self, route):
+        if _blocked(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _with_page(self, venue, fn):
+        venue_slots = self._venues.setdefault(venue, asyncio.Semaphore(self.per_venue))
+        async with venue_slots, self._contexts:
+            if not self._browser.is_connected():
+                # Chromium died (OOM on a small Railway box); start a fresh one
+                self._browser = await self._playwright.chromium.launch(headless=True)
+            context = await self._browser.new_context(user_agent=USER_AGENT)
+            try:
+                await context.route("**/*", self._route)
+                page = await context.new_page()
+                return await fn(page)
+            finally:
+                await context.close()
+
+    def run(self, venue, fn, timeout=None):
+        # fn is an async callable that receives a Page and returns the result
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._with_page(venue, fn), self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # Cancel the scrape too, or it keeps its page and venue slot after we give up
+            future.cancel()
+            raise
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    def close(self):
+        with self._start_lock:
+            if self._loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(30)
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = self._thread = self._browser = self._playwright = None
+                self._venues = {}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BrowserPool()
+        return _shared
+
+
+def close_shared_pool():
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
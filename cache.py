@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Every cached render is keyed on the data version. The version itself lives in
+# the database (database.bump_version, bumped in the same transaction as each
+# write), so a write on any replica invalidates renders on all of them. This
+# process mirrors it and rechecks at most once per VERSION_POLL_SECONDS.
+VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "2"))
+_lock = threading.Lock()
+_async_render_locks = {}
+_renders = {}
+# Keyed renders (one per calendar feed, say) share the table; past this many
+# names the oldest is dropped
+MAX_RENDERS = 512
+_version = 0
+_updated_at = time.time()
+_checked_at = 0.0
+
+
+def data_version():
+    return _version
+
+
+def data_updated_at():
+    return _updated_at
+
+
+def set_data_version(version, updated_at):
+    # Adopts the database's version; any change drops every render
+    global _version, _updated_at, _checked_at
+    with _lock:
+        if version != _version:
+            _version = version
+            _updated_at = updated_at
+            _renders.clear()
+        _checked_at = time.monotonic()
+    return _version
+
+
+async def refresh(read):
+    # Called before serving from cache; read() returns (version, updated_at)
+    global _checked_at
+    if time.monotonic() - _checked_at < VERSION_POLL_SECONDS:
+        return
+    try:
+        set_data_version(*await read())
+    except Exception as e:
+        # Database unreachable: keep serving what is cached, try again next poll
+        _checked_at = time.monotonic()
+        print(f"Data version check failed: {e}")
+
+
+def peek(name, key):
+    entry = _renders.get(name)
+    if entry is not None and entry[0] == (_version, key):
+        return entry[1]
+    return None
+
+
+def store(name, key, value, version):
+    # Dropped if a write landed while it was rendering; it's already stale
+    with _lock:
+        if version == _version:
+            _renders.pop(name, None)
+            _renders[name] = ((version, key), value)
+            while len(_renders) > MAX_RENDERS:
+                del _renders[next(iter(_renders))]
+
+
+async def tee(name, key, chunks, finish):
+    # Passes chunks through to a streaming response and caches finish(body) once
+    # the last one is out. A disconnect mid-stream closes the generator first,
+    # so a partial page is never stored.
+    version = _version
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    store(name, key, finish("".join(parts)), version)
+
+
+async def get_or_render_async(name, key, render):
+    # Concurrent misses for one name wait on an asyncio lock and reuse the first
+    # render, without blocking the loop
+    full_key = (_version, key)
+    cached = peek(name, key)
+    if cached is not None:
+        return cached
+    render_lock = _async_render_locks.setdefault(name, asyncio.Lock())
+    async with render_lock:
+        cached = peek(name, key)
+        if cached is not None:
+            return cached
+        value = await render()
+        store(name, key, value, full_key[0])
+        return value
+
+
+class CachedBody:
+    # A rendered body plus its precomputed compressed variants and validators
+    def __init__(self, body, media_type, not_before=0):
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.media_type = media_type
+        self.etag = f'"{_version}-{hashlib.sha1(self.body).hexdigest()[:16]}"'
+        # not_before covers renders that also change on their own, e.g. at midnight
+        self.modified_at = int(max(_updated_at, not_before))
+        self.last_modified = formatdate(self.modified_at, usegmt=True)
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=6)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=9)
+
+
+def _pick_encoding(accept_encoding, available):
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try: q = float(params.strip()[2:])
+            except ValueError: q = 0.0
+        accepted[coding.strip()] = q
+    for coding in ("br", "gzip"):
+        if coding in available and accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def _not_modified(request, cached):
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        if inm.strip() == "*": return True
+        # Strip the per-encoding suffix we add below before comparing
+        tags = {t.strip().removeprefix("W/").replace("-br\"", "\"").replace("-gzip\"", "\"") for t in inm.split(",")}
+        return cached.etag in tags
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try: return cached.modified_at <= int(parsedate_to_datetime(ims).timestamp())
+        except (TypeError, ValueError): return False
+    return False
+
+
+def respond(request, cached):
+    encoding = _pick_encoding(request.headers.get("accept-encoding", ""), cached.encoded)
+    etag = cached.etag if encoding is None else cached.etag[:-1] + f'-{encoding}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": cached.last_modified,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(cached.encoded[encoding], media_type=cached.media_type, headers=headers)
@@ -1,26 +1,17 @@
 import os
-import requests
-import time
-import urllib.parse
-from datetime import datetime, date
-from sqlalchemy import create_engine, Column, String, Date, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-Base = declarative_base()
-class Event(Base):
-    __tablename__ = 'events'
-    tm_id = Column(String, primary_key=True)
-    name = Column(String)
-    date_time = Column(Date)
-    venue_name = Column(String)
-    ticket_url = Column(Text)
-
-# Database Setup
-raw_db_url = os.getenv("DATABASE_PUBLIC_URL") or os.getenv("DATABASE_URL", "sqlite:///shows.db")
-db_url = raw_db_url.replace("postgres://", "postgresql://", 1) if "postgres://" in raw_db_url else raw_db_url
-engine = create_engine(db_url)
-SessionLocal = sessionmaker(bind=engine)
+from database import engine, SessionLocal, upsert_events, bump_version, read_version
+from models import Event, ROW_FIELDS, content_hash
+import dedup
+import venues
+import migrations
+import cache
+import dates
+import tm_client
+import sources
+import static_export
+# Imported for their @sources.register side effect
+import scraper_earl
+import inject_529
 
 # Venue Constants
 BOGGS = "Boggs Social & Supply"
@@ -86,85 +77,130 @@ VERIFIED_DATA = {
     ]
 }
 
-def fetch_tm():
+# Generic Venue Links
+VENUE_LINKS = {
+    V529: "https://529atlanta.com/calendar/", 
+    EARL: "https://www.freshtix.com/search?category=&end=&query=the+EARL&start=&state=GA", 
+    BOGGS: "https://www.freshtix.com/search?utf8=%E2%9C%93&query=boggs&commit=Search&start=&end=&state=GA&category=", 
+    EASTERN: "https://easternatl.com", 
+    T_WEST: "https://terminalwestatl.com", 
+    VARIETY: "https://varietyplayhouse.com", 
+    CULT_SHOCK: "https://cultureshockatl.com/#/events" # Updated to your specific page
+}
+
+def fetch_tm_result():
     api_key = os.getenv("TM_API_KEY")
-    if not api_key: return []
-    res, seen = [], set()
-    for page in range(10): 
-        try:
-            url = f"https://app.ticketmaster.com/discovery/v2/events.json?apikey={api_key}&geoPoint=33.7490,-84.3880&radius=30&unit=miles&classificationId=KZFzniwnSyZfZ7v7nJ,KnvZfZ7v7n1&size=100&page={page}&sort=date,asc"
-            r = requests.get(url)
-            data = r.json()
-            events = data.get('_embedded', {}).get('events', [])
-            if not events: break
-            for e in events:
-                if e['id'] not in seen:
-                    v_info = e['_embedded']['venues'][0]
-                    if v_info.get('state', {}).get('stateCode') == 'GA':
-                        res.append({"id": e['id'], "name": e['name'], "date": e['dates']['start']['localDate'], "venue": v_info['name'], "url": e['url']})
-                        seen.add(e['id'])
-            time.sleep(0.3) 
-        except Exception: break
-    return res
-
-def build_web_page():
-    db = SessionLocal()
-    events = db.query(Event).order_by(Event.date_time).all()
-    rows_html = ""
-    for e in events:
-        clean_name = e.name.replace("/", "-")
-        ics = f"BEGIN:VCALENDAR\\nVERSION:2.0\\nBEGIN:VEVENT\\nSUMMARY:{clean_name}\\nDTSTART:{e.date_time.strftime('%Y%m%d')}T200000\\nLOCATION:{e.venue_name}\\nEND:VEVENT\\nEND:VCALENDAR"
-        cal_uri = f"data:text/calendar;charset=utf8,{urllib.parse.quote(ics)}"
-        rows_html += f'<tr><td class="date-cell">{e.date_time.strftime("%a, %b %d")}</td><td class="lineup-cell">{e.name}</td><td class="venue-cell">{e.venue_name}</td><td><a href="{e.ticket_url}" target="_blank" class="btn-link">Tickets</a><a href="{cal_uri}" download="{clean_name[:10]}.ics" class="btn-cal">📅 Cal</a></td></tr>'
+    if not api_key: return tm_client.FetchResult([], False)
     try:
-        if os.path.exists("index.html"):
-            with open("index.html", "r", encoding="utf-8") as f: content = f.read()
-            if "<tbody>" in content:
-                parts = content.split("<tbody>")
-                new_content = parts[0] + "<tbody>" + rows_html + "</tbody>" + parts[1].split("</tbody>")[1]
-                with open("index.html", "w", encoding="utf-8") as f: f.write(new_content)
-    except Exception: pass
-    finally: db.close()
+        return tm_client.TMFetcher(api_key).fetch_all()
+    except tm_client.TMFetchError as e:
+        print(f"Ticketmaster sync error: {e}")
+        return tm_client.FetchResult([], False)
+
+@sources.register
+class TicketmasterSource(sources.Source):
+    name = "ticketmaster"
+    timeout = 120
+
+    def fetch(self):
+        result = fetch_tm_result()
+        events = [{"tm_id": e['id'], "name": e['name'], "date_time": dates.parse_date(e['date']), "venue_name": e['venue'], "ticket_url": e['url']} for e in result.events]
+        return sources.SourceResult(events, result.complete, result.digest)
+
+@sources.register
+class VerifiedSource(sources.Source):
+    name = "verified"
+    timeout = 5
+
+    def fetch(self):
+        events = []
+        for venue, shows in VERIFIED_DATA.items():
+            for s in shows:
+                dt = dates.parse_date(s['date'])
+                # Use specific URL if provided, otherwise fallback to venue generic link
+                t_url = s.get('url', VENUE_LINKS.get(venue, "https://www.freshtix.com/events/arippinproduction"))
+
+                # Fix for multiple shows on same day: Add slug to ID
+                slug = s['name'][:4].lower().replace(" ", "")
+                uid = f"man-{venue[:3].lower()}-{s['date']}-{slug}"
+
+                events.append({"tm_id": uid, "name": s['name'], "date_time": dt, "venue_name": venue, "ticket_url": t_url})
+        return events
+
+def ensure_schema():
+    migrations.migrate(engine)
+
+# Fingerprint of the last source payloads this process wrote to the DB
+_last_sync = {"digest": None, "rows": 0}
 
 def sync():
-    Base.metadata.create_all(bind=engine)
+    ensure_schema()
+    results = sources.collect_all()
+    today = dates.atl_today()
+    report = {name: {"events": len(r.events), "complete": r.complete, "seconds": r.seconds, "error": r.error} for name, r in results.items()}
+
+    # Every source returned exactly what this process last synced and nothing was
+    # written since, on any replica (writes bump the shared data version): nothing to diff
+    sources_digest = "-".join(f"{name}:{r.digest}:{r.complete}" for name, r in sorted(results.items())) + f"-{today}"
+    with engine.connect() as conn:
+        current_version = read_version(conn)[0]
+    if f"{sources_digest}-{current_version}" == _last_sync["digest"]:
+        return {"inserted": 0, "updated": 0, "expired": 0, "unchanged": _last_sync["rows"], "skipped": True, "sources": report}
+
+    incoming = {}
+    for name, r in results.items():
+        for e in r.events:
+            if e['date_time'] >= today: incoming[e['tm_id']] = dict(e, source=name, venue_key=venues.canonical_key(e['venue_name']))
+    # Sources whose fetch came back whole; only these may expire missing rows
+    complete_sources = {name for name, r in results.items() if r.complete}
+
     db = SessionLocal()
     try:
-        tm_shows = fetch_tm()
-        db.query(Event).delete()
-        today = date.today()
-        # Process Ticketmaster
-        for e in tm_shows:
-            dt = datetime.strptime(e['date'], "%Y-%m-%d").date()
-            if dt >= today: db.add(Event(tm_id=e['id'], name=e['name'], date_time=dt, venue_name=e['venue'], ticket_url=e['url']))
-        
-        # Generic Venue Links
-        links = {
-            V529: "https://529atlanta.com/calendar/", 
-            EARL: "https://www.freshtix.com/search?category=&end=&query=the+EARL&start=&state=GA", 
-            BOGGS: "https://www.freshtix.com/search?utf8=%E2%9C%93&query=boggs&commit=Search&start=&end=&state=GA&category=", 
-            EASTERN: "https://easternatl.com", 
-            T_WEST: "https://terminalwestatl.com", 
-            VARIETY: "https://varietyplayhouse.com", 
-            CULT_SHOCK: "https://cultureshockatl.com/#/events" # Updated to your specific page
-        }
-        
-        # Process Verified Data
-        for venue, shows in VERIFIED_DATA.items():
-            for s in shows:
-                dt = datetime.strptime(s['date'], "%Y-%m-%d").date()
-                if dt >= today:
-                    # Use specific URL if provided, otherwise fallback to venue generic link
-                    t_url = s.get('url', links.get(venue, "https://www.freshtix.com/events/arippinproduction"))
-                    
-                    # Fix for multiple shows on same day: Add slug to ID
-                    slug = s['name'][:4].lower().replace(" ", "")
-                    uid = f"man-{venue[:3].lower()}-{s['date']}-{slug}"
-                    
-                    db.add(Event(tm_id=uid, name=s['name'], date_time=dt, venue_name=venue, ticket_url=t_url))
-        
+        # Fold cross-source duplicates into one record. Manual rows take part too,
+        # including ones folded away earlier, so they come back if the winner goes.
+        manual = [{c: getattr(e, c) for c in ROW_FIELDS} for e in db.query(Event).filter(Event.source == "manual", Event.date_time >= today)]
+        merged, absorbed = dedup.resolve(list(incoming.values()) + manual)
+        incoming = {r["tm_id"]: r for r in merged}
+
+        # Diff against what is stored so writes scale with churn, not table size
+        stored = {r.tm_id: r for r in db.query(Event.tm_id, Event.source, Event.content_hash, Event.expired_at).filter(Event.date_time >= today)}
+        changed = []
+        for uid, row in incoming.items():
+            row["content_hash"] = content_hash(row)
+            row["expired_at"] = None
+            old = stored.get(uid)
+            if old is None or old.content_hash != row["content_hash"] or old.expired_at is not None:
+                changed.append(row)
+        upsert_events(db, changed)
+
+        # Soft-expire upcoming rows a complete source stopped returning, and duplicates
+        gone = [r.tm_id for r in stored.values()
+                if r.tm_id not in incoming and r.expired_at is None and (r.source in complete_sources or r.tm_id in absorbed)]
+        expired = 0
+        for i in range(0, len(gone), 500):
+            expired += db.query(Event).filter(Event.tm_id.in_(gone[i:i + 500]), Event.date_time >= today).update({Event.expired_at: today}, synchronize_session=False)
+
+        version = bump_version(db) if changed or expired else None
         db.commit()
-        build_web_page()
+        stats = {
+            "inserted": sum(1 for r in changed if r["tm_id"] not in stored),
+            "updated": sum(1 for r in changed if r["tm_id"] in stored),
+            "expired": expired,
+            "merged": len(absorbed),
+            "unchanged": len(incoming) - len(changed),
+            "sources": report,
+        }
+        if version:
+            cache.set_data_version(*version)
+            current_version = version[0]
+        # Cheap when nothing changed: only pages whose hash moved are rewritten.
+        # A failed write shouldn't fail the sync, which is already committed.
+        try:
+            stats["export"] = static_export.export_site(db, today=today)
+        except OSError as e:
+            print(f"Static export to {static_export.EXPORT_DIR} failed: {e}")
+        _last_sync.update(digest=f"{sources_digest}-{current_version}", rows=len(incoming))
+        return stats
     finally: db.close()
 
 if __name__ == "__main__":
@@ -1,66 +1,172 @@
+import asyncio
+import csv
+import io
 import os
-from sqlalchemy import create_engine, Column, String, Date, Text
-from sqlalchemy.ext.declarative import declarative_base
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from models import Event
 
-# 1. Database URL Logic
-# Try to get the Railway URL; if not found, use a clean local SQLite string
-raw_url = os.getenv("DATABASE_URL", "sqlite:///shows.db")
-
-# Safety check: if raw_url is empty or None, force it to sqlite
-if not raw_url or raw_url.strip() == "":
-    raw_url = "sqlite:///shows.db"
-
-# Cleanup whitespace
-db_url = raw_url.strip()
-
-# Fix for SQLAlchemy/Postgres naming compatibility (postgres:// -> postgresql://)
-if db_url.startswith("postgres://"):
-    db_url = db_url.replace("postgres://", "postgresql://", 1)
-
-print(f"DEBUG: Connecting to database type: {db_url.split(':')[0]}")
-
-# 2. Engine and Session Setup
-try:
-    engine = create_engine(db_url)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base = declarative_base()
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not create engine with URL: {db_url}")
-    # Last resort fallback to local sqlite so the server doesn't crash
-    engine = create_engine("sqlite:///shows.db")
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base = declarative_base()
-
-# 3. The Event Model
-class Event(Base):
-    __tablename__ = 'events'
-    tm_id = Column(String, primary_key=True)
-    name = Column(String)
-    date_time = Column(Date)
-    venue_name = Column(String)
-    ticket_url = Column(Text)
-
-def create_tables():
-    Base.metadata.create_all(bind=engine)
-
-def fetch_events():
-    db = SessionLocal()
+# Connection pool tuning; the defaults suit one Railway replica on a small Postgres
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+# Railway's proxy drops idle connections; recycle well before it does
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+# Per-statement limits: web requests fail fast, the collector's bulk writes get longer
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+DB_SYNC_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_SYNC_STATEMENT_TIMEOUT_MS", "300000"))
+DB_PREPARED_STATEMENT_CACHE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE", "256"))
+# Seconds a SQLite writer waits on the file lock before giving up; separate from
+# the statement timeouts, which SQLite has no equivalent of
+DB_SQLITE_BUSY_TIMEOUT = float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "15"))
+
+def normalize_url(raw):
+    # Railway hands out postgres:// URLs; SQLAlchemy only knows postgresql://, and
+    # its default Postgres driver is psycopg 3 while we ship psycopg2
+    url = (raw or "").strip() or "sqlite:///shows.db"
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            url = "postgresql+psycopg2://" + url[len(prefix):]
+    return url
+
+def async_url(url):
+    # Same database through asyncpg / aiosqlite, so a request waiting on the
+    # database doesn't hold a threadpool worker
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes ssl=, not libpq's sslmode=
+        query = dict(url.query)
+        if "sslmode" in query: query["ssl"] = query.pop("sslmode")
+        # Prepared statements are cached per connection by the asyncpg dialect
+        query.setdefault("prepared_statement_cache_size", str(DB_PREPARED_STATEMENT_CACHE))
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+def make_engine(url, is_async=False, statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS):
+    # The one place engines are built, so every caller gets the same pool settings
+    url = make_url(async_url(url) if is_async else url)
+    kwargs = {}
+    connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        if url.get_driver_name() == "asyncpg":
+            connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    elif url.get_backend_name() == "sqlite":
+        connect_args["timeout"] = DB_SQLITE_BUSY_TIMEOUT
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+    if is_async:
+        return create_async_engine(url, **kwargs)
+    return create_engine(url, **kwargs)
+
+db_url = normalize_url(os.getenv("DATABASE_PUBLIC_URL") or os.getenv("DATABASE_URL"))
+
+# Sync engine for the collector, scheduler and scripts; async engine for the web app
+engine = make_engine(db_url, statement_timeout_ms=DB_SYNC_STATEMENT_TIMEOUT_MS)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = make_engine(db_url, is_async=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def get_session():
+    # FastAPI dependency: one session per request, closed when the request ends
+    async with AsyncSessionLocal() as session:
+        yield session
+
+async def warm_up(connections=2):
+    # Opens a few pooled connections and runs a trivial query on each, so the
+    # first requests after a deploy don't pay for connect + TLS + auth
+    async def ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+# The data version every cached render is keyed on lives in a one-row table,
+# bumped in the same transaction as each write to events, so every replica
+# sees a write no matter which one made it (cache.refresh polls it)
+_BUMP_VERSION = text("UPDATE data_version SET version = version + 1, updated_at = :t WHERE id = 1 RETURNING version, updated_at")
+_READ_VERSION = text("SELECT version, updated_at FROM data_version WHERE id = 1")
+
+def bump_version(db):
+    # db is a Session or Connection inside the writing transaction; hand the
+    # result to cache.set_data_version once it commits
+    return tuple(db.execute(_BUMP_VERSION, {"t": time.time()}).one())
+
+def read_version(db):
+    return tuple(db.execute(_READ_VERSION).one())
+
+async def read_data_version():
+    async with async_engine.connect() as conn:
+        return tuple((await conn.execute(_READ_VERSION)).one())
+
+# Postgres batches at least this big go through COPY instead of INSERT ... VALUES
+COPY_THRESHOLD = 1000
+
+def _copy_upsert(db, rows):
+    # One COPY into a temp staging table and one INSERT ... SELECT for the lot
+    columns = list(rows[0])
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        # None is written as an unquoted empty field, which COPY reads as NULL
+        writer.writerow([None if row.get(c) is None else str(row[c]) for c in columns])
+    buf.seek(0)
+    cols = ", ".join(columns)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "tm_id")
+    db.execute(text("CREATE TEMP TABLE IF NOT EXISTS events_staging (LIKE events INCLUDING DEFAULTS) ON COMMIT DROP"))
+    cursor = db.connection().connection.cursor()
     try:
-        # Get all shows sorted by date
-        events = db.query(Event).order_by(Event.date_time.asc()).all()
-        
-        formatted_events = []
-        for e in events:
-            # These keys match the 'alias' names in your EventResponse model
-            # Your JavaScript is looking for these exact words
-            formatted_events.append({
-                "id": str(e.tm_id),
-                "name": e.name,
-                "venue_name": e.venue_name,
-                "date_time": e.date_time,
-                "ticket_url": e.ticket_url
-            })
-        return formatted_events
+        cursor.copy_expert(f"COPY events_staging ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
     finally:
-        db.close()
\ No newline at end of file
+        cursor.close()
+    db.execute(text(f"INSERT INTO events ({cols}) SELECT {cols} FROM events_staging ON CONFLICT (tm_id) DO UPDATE SET {updates}"))
+    db.execute(text("TRUNCATE events_staging"))
+
+def _copy_upsert_asyncpg(db, rows):
+    # Same as _copy_upsert for a session driven through AsyncSession.run_sync:
+    # asyncpg's binary COPY, awaited from the sync side
+    columns = list(rows[0])
+    records = [tuple(row.get(c) for c in columns) for row in rows]
+    cols = ", ".join(columns)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "tm_id")
+    db.execute(text("CREATE TEMP TABLE IF NOT EXISTS events_staging (LIKE events INCLUDING DEFAULTS) ON COMMIT DROP"))
+    adapted = db.connection().connection.dbapi_connection
+    adapted.run_async(lambda conn: conn.copy_records_to_table("events_staging", records=records, columns=columns))
+    db.execute(text(f"INSERT INTO events ({cols}) SELECT {cols} FROM events_staging ON CONFLICT (tm_id) DO UPDATE SET {updates}"))
+    db.execute(text("TRUNCATE events_staging"))
+
+def upsert_events(db, rows, chunk_size=100):
+    # One multi-row INSERT ... ON CONFLICT per chunk instead of a SELECT + write per row
+    if not rows: return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql" and len(rows) >= COPY_THRESHOLD:
+        driver = db.get_bind().dialect.driver
+        if driver == "psycopg2": return _copy_upsert(db, rows)
+        if driver == "asyncpg": return _copy_upsert_asyncpg(db, rows)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows: db.merge(Event(**row))
+        return
+    for i in range(0, len(rows), chunk_size):
+        stmt = insert(Event.__table__).values(rows[i:i + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tm_id"],
+            set_={k: stmt.excluded[k] for k in rows[0] if k != "tm_id"}
+        )
+        db.execute(stmt)
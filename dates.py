@@ -0,0 +1,104 @@
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import pytz
+
+ATL_TZ = pytz.timezone('US/Eastern')
+
+# A date pasted without a year is taken as this year unless that puts it more
+# than this far in the past, in which case it's next year ("Jan 4" in December)
+PAST_GRACE_DAYS = 14
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+_MONTH = "(?P<month>" + _MONTH_NAMES + r")\.?"
+_WEEKDAY = r"(?:(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)[a-z]*\.?,?\s+)?"
+_DAY = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+# The end of a range ("Mar 6-8", "3/6 - 3/8", "Mar 6 thru Apr 2") is dropped; a
+# show is listed on its first night. The end must itself look like a date, so
+# "Mar 6 - whatever" and "3/6 today" are not ranges.
+_ANY_MONTH = "(?:" + _MONTH_NAMES + r")\.?"
+_RANGE_END = (_WEEKDAY + r"(?:" + _ANY_MONTH + r"\s+\d{1,2}(?:st|nd|rd|th)?"
+              r"|\d{1,2}(?:[/.-]\d{1,2}(?:[/.-](?:\d{4}|\d{2}))?|(?:st|nd|rd|th)?(?:\s+" + _ANY_MONTH + r")?))"
+              r"(?:,?\s+\d{4})?")
+_RANGE = r"(?:\s*(?:-|–|—|\bto\b|\bthru\b|\bthrough\b)\s*" + _RANGE_END + ")?"
+
+PATTERNS = [
+    # 2027-03-06, 2027-03-06T20:00:00-05:00
+    re.compile(r"(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})(?:[t\s].*)?"),
+    # 03-06-2027, 3/6/27, 3.6.2027
+    re.compile(r"(?P<month>\d{1,2})([-/.])(?P<day>\d{1,2})\2(?P<year>\d{4}|\d{2})" + _RANGE),
+    # Mar 6, Fri, March 6th 2027, Mar 6-8
+    re.compile(_WEEKDAY + _MONTH + r"\s+" + _DAY + r"(?:,?\s+(?P<year>\d{4}))?" + _RANGE),
+    # 6 Mar, 6 March 2027
+    re.compile(_WEEKDAY + _DAY + r"\s+" + _MONTH + r"(?:,?\s+(?P<year>\d{4}))?" + _RANGE),
+    # 3/6, Fri 3.6, 3/6-3/8
+    re.compile(_WEEKDAY + r"(?P<month>\d{1,2})[/.](?P<day>\d{1,2})" + _RANGE),
+]
+# Show times carry no date information: "8pm", "@ 7:30 PM", "doors 7"
+_TIME = re.compile(r"\s*(?:@|at|doors|show)?\s*\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\s*@?\s*\b\d{1,2}:\d{2}\b(?!-)")
+
+
+class DateParseError(ValueError):
+    def __init__(self, text, reason="unrecognized date"):
+        super().__init__(f"{reason} '{text}'" if text else reason)
+        self.text = text
+        self.reason = reason
+
+
+def atl_today():
+    return datetime.now(ATL_TZ).date()
+
+
+def _infer_year(month, day, today):
+    candidate = date(today.year, month, day)
+    if candidate < today - timedelta(days=PAST_GRACE_DAYS):
+        candidate = date(today.year + 1, month, day)
+    return candidate
+
+
+@lru_cache(maxsize=8192)
+def _parse(text, today):
+    cleaned = text.strip().lower()
+    if not re.match(r"\d{4}-", cleaned):
+        cleaned = _TIME.sub("", cleaned).strip(" ,@")
+    for pattern in PATTERNS:
+        m = pattern.fullmatch(cleaned)
+        if not m:
+            continue
+        parts = m.groupdict()
+        month = MONTHS.get(parts["month"]) or int(parts["month"])
+        day = int(parts["day"])
+        year = parts.get("year")
+        try:
+            if year is None:
+                return _infer_year(month, day, today)
+            year = int(year)
+            return date(year + 2000 if year < 100 else year, month, day)
+        except ValueError:
+            raise DateParseError(text, "no such date")
+    raise DateParseError(text)
+
+
+def parse_date(text, today=None):
+    if not text or not str(text).strip():
+        raise DateParseError(text or "", "missing date")
+    return _parse(str(text), today or atl_today())
+
+
+def parse_many(texts, today=None):
+    # One pass over the distinct strings, results in input order; a failed
+    # entry holds its DateParseError instead of a date
+    today = today or atl_today()
+    parsed = {}
+    for text in set(texts):
+        try:
+            parsed[text] = parse_date(text, today)
+        except DateParseError as e:
+            parsed[text] = e
+    return [parsed[t] for t in texts]
@@ -0,0 +1,193 @@
+import json
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# When the same show arrives from several feeds, the record from the earliest
+# source here wins (it has the real ticket link); the others fold into it.
+SOURCE_PRIORITY = ["ticketmaster", "earl", "verified", "529", "manual"]
+MATCH_THRESHOLD = 0.75
+
+_SPLIT = re.compile(r'\s+/\s+|\s+w/\s*|,\s*|\(|\)|\s+with\s+(?:special\s+guests?\s*)?', re.I)
+_COMMA_SPLIT = re.compile(r',\s*')
+_NOISE = {"sold out", "rescheduled", "live loud", "solo", "local support", "tba", "special guests", "and more"}
+_TIME = re.compile(r'\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m\b', re.I)
+
+
+def normalize_artist(name):
+    name = re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+    return re.sub(r'^the ', '', name)
+
+
+def show_time(name):
+    # "Bazooka Tooth (7pm)" -> "19:00"; None when the listing gives no time
+    m = _TIME.search(name or "")
+    if not m:
+        return None
+    hour = int(m.group(1)) % 12 + (12 if m.group(3).lower() == "p" else 0)
+    return f"{hour:02d}:{m.group(2) or '00'}"
+
+
+def split_artists(lineup, commas=True):
+    # "Wednesday / Gouge Away (Sold Out)" -> ["wednesday", "gouge away"]
+    artists = []
+    lineup = lineup or ""
+    for part in _SPLIT.split(lineup if commas else _COMMA_SPLIT.sub(" ", lineup)):
+        artist = normalize_artist(part)
+        if artist and artist not in _NOISE and not re.fullmatch(r'\d{1,2}\s*(am|pm)', artist) and artist not in artists:
+            artists.append(artist)
+    return artists
+
+
+def _is_prefix_act(a, b):
+    # "Earth" against "Earth, Wind & Fire": a one-word name that starts the
+    # other is a different act, not its headliner
+    a, b = normalize_artist(a), normalize_artist(b)
+    return " " not in a and b.startswith(a + " ")
+
+
+def similarity(a, b):
+    commas = not (_is_prefix_act(a, b) or _is_prefix_act(b, a))
+    artists_a, artists_b = split_artists(a, commas), split_artists(b, commas)
+    if not artists_a or not artists_b:
+        return 0.0
+    if artists_a[0] == artists_b[0]:
+        return 1.0
+    shared = len(set(artists_a) & set(artists_b)) / min(len(artists_a), len(artists_b))
+    tokens_a = set(" ".join(artists_a).split())
+    tokens_b = set(" ".join(artists_b).split())
+    # Over the larger set, so one shared word ("band") can't carry a match
+    token_overlap = len(tokens_a & tokens_b) / max(len(tokens_a), len(tokens_b))
+    # Catches typos in the headliner ("Redd Kros" vs "Redd Kross"), but numbers
+    # are part of the name ("Blink 182", "Show 2") and must agree exactly
+    headliner = 0.0
+    if re.sub(r'\D', '', artists_a[0]) == re.sub(r'\D', '', artists_b[0]):
+        headliner = SequenceMatcher(None, artists_a[0], artists_b[0]).ratio()
+    return max(shared, token_overlap * 0.9, headliner if headliner >= 0.85 else 0.0)
+
+
+def _priority(row):
+    source = row.get("source")
+    return SOURCE_PRIORITY.index(source) if source in SOURCE_PRIORITY else len(SOURCE_PRIORITY)
+
+
+def merge(cluster):
+    cluster = sorted(cluster, key=lambda r: (_priority(r), r["tm_id"]))
+    winner = dict(cluster[0])
+    if len(cluster) == 1:
+        winner["provenance"] = None
+        return winner
+    # Append openers that only the other feeds know about
+    parts = [winner["name"]]
+    known = set(split_artists(winner["name"]))
+    for row in cluster[1:]:
+        for part in re.split(r'\s+/\s+', row["name"]):
+            artists = split_artists(part)
+            if artists and not known.intersection(artists):
+                parts.append(part.strip())
+                known.update(artists)
+    winner["name"] = " / ".join(parts)
+    winner["ticket_url"] = next((r["ticket_url"] for r in cluster if r.get("ticket_url")), None)
+    winner["provenance"] = json.dumps([{"source": r.get("source"), "tm_id": r["tm_id"]} for r in cluster])
+    return winner
+
+
+def _blocks(rows):
+    # Block on (date, canonical venue, show time) so only plausible pairs are
+    # ever compared and an early and a late show never fold together. A listing
+    # without a time joins the timed block when that night has only one time.
+    blocks = defaultdict(list)
+    for row in rows:
+        blocks[(row["date_time"], row["venue_key"], show_time(row["name"]))].append(row)
+    times = defaultdict(list)
+    for day, venue, time in blocks:
+        if time:
+            times[(day, venue)].append(time)
+    for (day, venue), found in times.items():
+        if len(found) == 1 and (day, venue, None) in blocks:
+            blocks[(day, venue, found[0])] += blocks.pop((day, venue, None))
+    return blocks.values()
+
+
+def clusters(rows):
+    for block in _blocks(rows):
+        found = []
+        for row in sorted(block, key=lambda r: (_priority(r), r["tm_id"])):
+            for cluster in found:
+                # Compare with the cluster's head only; chaining through members
+                # would let "Show 1" pull in "Show 2" via a third listing
+                if similarity(row["name"], cluster[0]["name"]) >= MATCH_THRESHOLD:
+                    cluster.append(row)
+                    break
+            else:
+                found.append([row])
+        yield from found
+
+
+def resolve(rows):
+    merged, absorbed = [], set()
+    for cluster in clusters(rows):
+        winner = merge(cluster)
+        merged.append(winner)
+        absorbed.update(r["tm_id"] for r in cluster if r["tm_id"] != winner["tm_id"])
+    return merged, absorbed
+
+
+def _keep_provenance(winner, stored_provenance):
+    # Entries a stored member already carries (feed listings folded in at sync
+    # and since expired) stay on the winner alongside the new cluster's
+    entries = json.loads(winner["provenance"]) if winner.get("provenance") else [{"source": winner.get("source"), "tm_id": winner["tm_id"]}]
+    seen = {x["tm_id"] for x in entries}
+    for raw in stored_provenance:
+        for x in json.loads(raw):
+            if x["tm_id"] not in seen:
+                entries.append(x)
+                seen.add(x["tm_id"])
+    winner["provenance"] = json.dumps(entries) if len(entries) > 1 else None
+
+
+def write_with_dedup(db, rows, today):
+    # For ad-hoc writes like a /theking paste: resolve the new rows against what
+    # is already stored in the same (date, venue) blocks, then write the result.
+    from sqlalchemy import or_, tuple_
+    from database import upsert_events
+    from models import Event, ROW_FIELDS, content_hash
+
+    new_ids = {r["tm_id"] for r in rows}
+    keys = list({(r["date_time"], r["venue_key"]) for r in rows})
+    stored = []
+    for i in range(0, len(keys), 200):
+        stored += db.query(Event).filter(
+            tuple_(Event.date_time, Event.venue_key).in_(keys[i:i + 200]),
+            or_(Event.expired_at.is_(None), Event.source == "manual"),
+        ).all()
+    stored_provenance = {e.tm_id: e.provenance for e in stored if e.provenance}
+    pool = [{c: getattr(e, c) for c in ROW_FIELDS} for e in stored if e.tm_id not in new_ids] + list(rows)
+
+    out, absorbed = [], set()
+    for cluster in clusters(pool):
+        # Stored shows the paste didn't match are left exactly as they are
+        if not any(r["tm_id"] in new_ids for r in cluster):
+            continue
+        winner = merge(cluster)
+        _keep_provenance(winner, [stored_provenance[r["tm_id"]] for r in cluster if r["tm_id"] in stored_provenance])
+        winner.update(content_hash=content_hash(winner), expired_at=None)
+        out.append(winner)
+        absorbed.update(r["tm_id"] for r in cluster if r["tm_id"] != winner["tm_id"])
+    # New rows that folded into an existing show are kept, expired, for provenance
+    for row in rows:
+        if row["tm_id"] in absorbed:
+            out.append(dict(row, provenance=None, content_hash=content_hash(row), expired_at=today))
+    ids = list(new_ids)
+    existing = set()
+    for i in range(0, len(ids), 500):
+        existing.update(r.tm_id for r in db.query(Event.tm_id).filter(Event.tm_id.in_(ids[i:i + 500])))
+    upsert_events(db, out)
+    old_absorbed = [e.tm_id for e in stored if e.tm_id in absorbed and e.expired_at is None]
+    if old_absorbed:
+        db.query(Event).filter(Event.tm_id.in_(old_absorbed)).update({Event.expired_at: today}, synchronize_session=False)
+
+    # Counted per incoming row: folded into another show, rewritten, or new
+    merged = sum(1 for i in new_ids if i in absorbed)
+    updated = sum(1 for i in new_ids if i in existing and i not in absorbed)
+    return {"inserted": len(new_ids) - merged - updated, "updated": updated, "merged": merged}
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Seconds a cached response is trusted before we revalidate it upstream
+SOURCE_TTLS = {
+    "ticketmaster": 15 * 60,
+    "freshtix": 60 * 60,
+    "bandsintown": 60 * 60,
+    "default": 10 * 60,
+}
+
+# changed is False when the body hashes the same as the last stored copy
+CachedResponse = namedtuple("CachedResponse", ["url", "status", "body", "headers", "from_cache", "changed", "content_hash"])
+
+
+def make_session(pool_size=10):
+    # Keep-alive connections shared by every worker thread
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class HTTPCache:
+    def __init__(self, directory=HTTP_CACHE_DIR, session=None, ttls=SOURCE_TTLS):
+        self.directory = directory
+        self.session = session or make_session()
+        self.ttls = ttls
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        # Keyed by a hash of the full URL so API keys never land on disk in clear
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + suffix)
+
+    def _load_meta(self, url):
+        try:
+            with open(self._path(url, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_body(self, url):
+        with open(self._path(url, ".body"), "rb") as f:
+            return f.read()
+
+    def fetch(self, url, source="default", params=None, headers=None, timeout=(5, 20)):
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        meta = self._load_meta(full_url)
+        ttl = self.ttls.get(source, self.ttls["default"])
+
+        if meta and time.time() - meta["fetched_at"] < ttl:
+            try:
+                return CachedResponse(full_url, 200, self._load_body(full_url), meta["headers"], True, False, meta["content_hash"])
+            except OSError:
+                meta = None
+
+        req_headers = dict(headers or {})
+        if meta:
+            if meta["headers"].get("etag"): req_headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"): req_headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+
+        r = self.session.get(full_url, headers=req_headers, timeout=timeout)
+        if r.status_code == 304 and meta:
+            try:
+                body = self._load_body(full_url)
+                meta["fetched_at"] = time.time()
+                _write_atomic(self._path(full_url, ".json"), json.dumps(meta).encode("utf-8"))
+                return CachedResponse(full_url, 200, body, meta["headers"], True, False, meta["content_hash"])
+            except OSError:
+                # Lost the stored body; fetch it again unconditionally
+                meta = None
+                r = self.session.get(full_url, headers=headers or {}, timeout=timeout)
+        if r.status_code != 200:
+            return CachedResponse(full_url, r.status_code, r.content, r.headers, False, True, None)
+
+        body = r.content
+        digest = hashlib.sha256(body).hexdigest()
+        kept = {k.lower(): v for k, v in r.headers.items() if k.lower() in ("etag", "last-modified", "content-type", "retry-after")}
+        _write_atomic(self._path(full_url, ".body"), body)
+        _write_atomic(self._path(full_url, ".json"), json.dumps({"fetched_at": time.time(), "headers": kept, "content_hash": digest}).encode("utf-8"))
+        changed = meta is None or meta.get("content_hash") != digest
+        return CachedResponse(full_url, 200, body, kept, False, changed, digest)
+
+    def _load_parsed(self, url, content_hash):
+        try:
+            with open(self._path(url, ".parsed.json"), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored["content_hash"] == content_hash:
+                return stored["data"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _store_parsed(self, url, content_hash, data):
+        _write_atomic(self._path(url, ".parsed.json"), json.dumps({"content_hash": content_hash, "data": data}).encode("utf-8"))
+
+    def parsed(self, resp, parse):
+        # Reuse the stored parse of an identical payload instead of re-parsing it
+        if resp.content_hash:
+            stored = self._load_parsed(resp.url, resp.content_hash)
+            if stored is not None:
+                return stored
+        data = parse(resp.body)
+        if resp.content_hash:
+            self._store_parsed(resp.url, resp.content_hash, data)
+        return data
+
+    def stream_parsed(self, url, source="default", parse=None, headers=None, timeout=(5, 20), chunk_size=STREAM_CHUNK_SIZE):
+        # fetch() + parsed() for large pages: the body goes from the socket to
+        # parse(chunks) a chunk at a time (and to disk for the next conditional
+        # GET), never whole into memory. A fresh or 304 response returns the
+        # stored parse without reading a body. Returns (status, data).
+        full_url = requests.Request("GET", url).prepare().url
+        meta = self._load_meta(full_url)
+        stored = self._load_parsed(full_url, meta["content_hash"]) if meta else None
+        if stored is not None and time.time() - meta["fetched_at"] < self.ttls.get(source, self.ttls["default"]):
+            return 200, stored
+
+        req_headers = dict(headers or {})
+        if stored is not None:
+            if meta["headers"].get("etag"): req_headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"): req_headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+
+        with self.session.get(full_url, headers=req_headers, timeout=timeout, stream=True) as r:
+            if r.status_code == 304 and stored is not None:
+                meta["fetched_at"] = time.time()
+                _write_atomic(self._path(full_url, ".json"), json.dumps(meta).encode("utf-8"))
+                return 200, stored
+            if r.status_code != 200:
+                return r.status_code, None
+
+            digest = hashlib.sha256()
+            body_path = self._path(full_url, ".body")
+            tmp = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+            def chunks():
+                with open(tmp, "wb") as f:
+                    for chunk in r.iter_content(chunk_size):
+                        digest.update(chunk)
+                        f.write(chunk)
+                        yield chunk
+
+            try:
+                body = chunks()
+                data = parse(body)
+                # The hash and the stored copy need the whole body, even if the
+                # parser stopped early
+                for _ in body:
+                    pass
+                os.replace(tmp, body_path)
+            finally:
+                body.close()
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            kept = {k.lower(): v for k, v in r.headers.items() if k.lower() in ("etag", "last-modified", "content-type", "retry-after")}
+
+        content_hash = digest.hexdigest()
+        _write_atomic(self._path(full_url, ".json"), json.dumps({"fetched_at": time.time(), "headers": kept, "content_hash": content_hash}).encode("utf-8"))
+        self._store_parsed(full_url, content_hash, data)
+        return 200, data
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPCache()
+        return _shared
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+ICS_TYPE = "text/calendar; charset=utf-8"
+UID_DOMAIN = "atlshowfinder"
+# Hint to calendar apps; the ETag makes polls between syncs a 304
+REFRESH_INTERVAL = "PT6H"
+
+
+def escape(value):
+    # RFC 5545 TEXT: backslash first, then the separators and newlines
+    return (str(value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line):
+    # Content lines are limited to 75 octets; longer ones continue on lines
+    # starting with a space. Never split inside a UTF-8 sequence.
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    out, current, size = [], "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > (75 if not out else 74):
+            out.append(current)
+            current, size = "", 0
+        current += ch
+        size += n
+    out.append(current)
+    return "\r\n ".join(out) + "\r\n"
+
+
+def header(name):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ATL Show Finder//Shows//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape(name)}",
+        "X-WR-TIMEZONE:America/New_York",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+    ]
+    return "".join(fold(l) for l in lines)
+
+
+def footer():
+    return "END:VCALENDAR\r\n"
+
+
+def vevent(e, stamp):
+    # UID is the stored event ID, so a re-synced or edited show updates the
+    # calendar entry in place instead of adding a second one. Shows only carry
+    # a date, so each is an all-day event.
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{e.tm_id}@{UID_DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{e.date_time:%Y%m%d}",
+        f"DTEND;VALUE=DATE:{e.date_time + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{escape(e.name)}",
+        f"LOCATION:{escape(e.venue_name)}",
+    ]
+    if e.ticket_url:
+        lines.append(f"URL:{e.ticket_url}")
+        lines.append(f"DESCRIPTION:{escape('Tickets: ' + e.ticket_url)}")
+    lines.append("TRANSP:TRANSPARENT")
+    lines.append("END:VEVENT")
+    return "".join(fold(l) for l in lines)
+
+
+def dtstamp(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
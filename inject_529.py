@@ -1,24 +1,10 @@
 import os
-from sqlalchemy import create_engine, Column, String, Date, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-
-# --- Database Config ---
-Base = declarative_base()
-class Event(Base):
-    __tablename__ = 'events'
-    tm_id = Column(String, primary_key=True)
-    name = Column(String)
-    date_time = Column(Date)
-    venue_name = Column(String)
-    ticket_url = Column(Text)
-
-# Use your Railway Database URL
-raw_db_url = os.getenv("DATABASE_PUBLIC_URL") or os.getenv("DATABASE_URL", "sqlite:///shows.db")
-db_url = raw_db_url.replace("postgres://", "postgresql://", 1) if "postgres://" in raw_db_url else raw_db_url
-engine = create_engine(db_url)
-SessionLocal = sessionmaker(bind=engine)
+from database import engine, SessionLocal, bump_version
+from models import Event
+import venues
+import migrations
+import sources
+import dates
 
 # --- Verified Data from Screenshot ---
 VERIFIED_SHOWS = [
@@ -33,27 +19,38 @@ VERIFIED_SHOWS = [
     {"date": "2026-01-31", "name": "Too Hot For Leather", "lineup": "Yevara, Vices of Vanity"}
 ]
 
+def to_event(show):
+    # Unique ID based on date and name
+    return {
+        "tm_id": f"529-{show['date']}-{show['name'][:5].lower().replace(' ', '')}",
+        "name": f"{show['name']} ({show['lineup']})",
+        "date_time": dates.parse_date(show['date']),
+        "venue_name": "529",
+        "ticket_url": "https://529atlanta.com/calendar/"
+    }
+
+@sources.register
+class Venue529Source(sources.Source):
+    name = "529"
+    timeout = 5
+
+    def fetch(self):
+        return [to_event(show) for show in VERIFIED_SHOWS]
+
 def inject():
-    Base.metadata.create_all(bind=engine)
+    migrations.migrate(engine)
     db = SessionLocal()
     count = 0
     try:
         for show in VERIFIED_SHOWS:
-            show_date = datetime.strptime(show['date'], "%Y-%m-%d").date()
-            # Unique ID based on date and name
-            unique_id = f"529-{show['date']}-{show['name'][:5].lower().replace(' ', '')}"
-            
-            existing = db.query(Event).filter_by(tm_id=unique_id).first()
+            row = to_event(show)
+            existing = db.query(Event).filter_by(tm_id=row['tm_id']).first()
             if not existing:
-                new_event = Event(
-                    tm_id=unique_id,
-                    name=f"{show['name']} ({show['lineup']})",
-                    date_time=show_date,
-                    venue_name="529",
-                    ticket_url="https://529atlanta.com/calendar/"
-                )
-                db.add(new_event)
+                db.add(Event(**row, source="529", venue_key=venues.canonical_key(row['venue_name'])))
                 count += 1
+        if count:
+            # Tells every running replica its cached pages are stale
+            bump_version(db)
         db.commit()
         print(f"--- SUCCESS: Injected {count} verified shows from 529 calendar image. ---")
     except Exception as e:
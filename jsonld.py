@@ -0,0 +1,57 @@
+import codecs
+from html.parser import HTMLParser
+
+JSONLD_TYPE = "application/ld+json"
+
+
+class JSONLDExtractor(HTMLParser):
+    # Incremental parser that keeps only the text of ld+json <script> blocks;
+    # everything else in the page is dropped as it streams past.
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.blocks = []
+        self._buf = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script":
+            script_type = (dict(attrs).get("type") or "").split(";")[0].strip().lower()
+            if script_type == JSONLD_TYPE:
+                self._buf = []
+
+    def handle_data(self, data):
+        if self._buf is not None:
+            self._buf.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._buf is not None:
+            self.blocks.append("".join(self._buf))
+            self._buf = None
+
+
+def decode_chunks(chunks, encoding="utf-8"):
+    # Bytes chunks as they come off the socket -> text, never splitting a
+    # multi-byte character across two pieces
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def extract_jsonld(chunks):
+    parser = JSONLDExtractor()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.blocks
+
+
+def iter_jsonld_items(data):
+    # Flattens top-level lists and (nested) @graph containers into plain objects
+    if isinstance(data, list):
+        for item in data:
+            yield from iter_jsonld_items(item)
+    elif isinstance(data, dict):
+        if "@graph" in data:
+            yield from iter_jsonld_items(data["@graph"])
+        else:
+            yield data
@@ -1,35 +1,47 @@
 import os
 import io
+import asyncio
 import re
 import json
-from fastapi import FastAPI, Form, Request, Body, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
-from sqlalchemy import create_engine, Column, String, Date, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import base64
+import html
+from fastapi import FastAPI, Form, Request, Body, UploadFile, File, HTTPException, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse, Response
+from sqlalchemy import and_, delete, func, or_, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import date, datetime
-import pytz
+import cache
+import dates
+import ical
+from database import engine, async_engine, AsyncSessionLocal, get_session, warm_up, bump_version, read_data_version
+from models import Event, ArchivedEvent
+import venues
+import dedup
+import search_index
+import paste_parser
+import migrations
+import scheduler
+import browser_pool
 
-ATL_TZ = pytz.timezone('US/Eastern')
+ATL_TZ = dates.ATL_TZ
 
 
-Base = declarative_base()
-class Event(Base):
-    __tablename__ = 'events'
-    tm_id = Column(String, primary_key=True)
-    name = Column(String)
-    date_time = Column(Date)
-    venue_name = Column(String)
-    ticket_url = Column(Text)
+@asynccontextmanager
+async def lifespan(app):
+    # Schema checks run here rather than at import, off the event loop, and the
+    # pool is warmed before the first request arrives
+    await asyncio.to_thread(migrations.migrate, engine)
+    await asyncio.to_thread(search_index.has_index)
+    await warm_up()
+    sync_task = scheduler.start()
+    yield
+    if sync_task: sync_task.cancel()
+    await asyncio.to_thread(browser_pool.close_shared_pool)
+    await async_engine.dispose()
 
-raw_db_url = os.getenv("DATABASE_PUBLIC_URL") or os.getenv("DATABASE_URL", "sqlite:///shows.db")
-db_url = raw_db_url.replace("postgres://", "postgresql://", 1) if "postgres://" in raw_db_url else raw_db_url
-engine = create_engine(db_url)
-Base.metadata.create_all(bind=engine)
-SessionLocal = sessionmaker(bind=engine)
-
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 COMMON_STYLE = """
 <style>
@@ -60,37 +72,256 @@ COMMON_STYLE = """
 </style>
 """
 
+def atl_midnight(day):
+    return ATL_TZ.localize(datetime.combine(day, datetime.min.time())).timestamp()
+
 @app.get("/", response_class=HTMLResponse)
-def read_root():
-    db = SessionLocal()
-    today = datetime.now(ATL_TZ).date()
+async def read_root(request: Request):
+    today = dates.atl_today()
+    await cache.refresh(read_data_version)
+    # Keyed on today's date too, so the page rolls over at Atlanta midnight
+    cached = cache.peek("listing", today)
+    if cached is not None:
+        return cache.respond(request, cached)
+    # Miss: stream the page as it renders and keep the finished body for the next hit
+    body = cache.tee("listing", today, iter_listing(today), lambda html: cache.CachedBody(html, "text/html; charset=utf-8", atl_midnight(today)))
+    return StreamingResponse(body, media_type="text/html; charset=utf-8", headers={"Cache-Control": "no-cache"})
+
+CALENDAR_CHUNK_ROWS = 200
+
+@app.get("/calendar.ics")
+async def calendar_feed(request: Request, venue: str = None, q: str = None):
+    # Subscribable feeds: every upcoming show, one venue (?venue=earl) or an
+    # artist search (?q=wednesday), each cached per data version like the listing
+    today = dates.atl_today()
+    venue_key = venues.canonical_key(venue) if venue and venue != "all" else None
+    q = " ".join(search_index.tokens(q))
+    name = f"calendar:{venue_key or ''}:{q}"
+    await cache.refresh(read_data_version)
+    cached = cache.peek(name, today)
+    if cached is not None:
+        return cache.respond(request, cached)
+    body = cache.tee(name, today, iter_calendar(today, venue_key, q), lambda ics: cache.CachedBody(ics, ical.ICS_TYPE, atl_midnight(today)))
+    return StreamingResponse(body, media_type=ical.ICS_TYPE, headers={"Cache-Control": "no-cache"})
+
+async def iter_calendar(today, venue_key, q):
+    title = "ATL Shows"
+    if venue_key: title += f" at {venues.display_name(venue_key)}"
+    if q: title += f": {q}"
+    stamp = ical.dtstamp(cache.data_updated_at())
+    yield ical.header(title)
+    async with AsyncSessionLocal() as session:
+        rows = await session.stream(upcoming_query(session, ROW_COLUMNS, today, venue=venue_key, q=q or None).execution_options(yield_per=CALENDAR_CHUNK_ROWS))
+        async for batch in rows.partitions():
+            yield "".join(ical.vevent(e, stamp) for e in batch)
+    yield ical.footer()
+
+@app.get("/events/{tm_id:path}.ics")
+async def event_calendar(request: Request, tm_id: str, session: AsyncSession = Depends(get_session)):
+    # One show as a download, for the "add to calendar" link on each row. A path
+    # parameter, since manual IDs carry the lineup's "/" ("manual-A/B-2026-12-09")
+    e = (await session.execute(select(*ROW_COLUMNS).where(Event.tm_id == tm_id))).first()
+    if e is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    body = ical.header(e.name) + ical.vevent(e, ical.dtstamp(cache.data_updated_at())) + ical.footer()
+    response = cache.respond(request, cache.CachedBody(body, ical.ICS_TYPE))
+    response.headers["Content-Disposition"] = f'attachment; filename="{re.sub(r"[^A-Za-z0-9_-]+", "-", e.name)[:40].strip("-") or "show"}.ics"'
+    return response
+
+# Columns the /events API can project; "id" is kept for the Flutter client
+EVENT_FIELDS = {
+    "id": Event.tm_id,
+    "tm_id": Event.tm_id,
+    "name": Event.name,
+    "date_time": Event.date_time,
+    "venue_name": Event.venue_name,
+    "ticket_url": Event.ticket_url,
+}
+EVENTS_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(day, tm_id):
+    return base64.urlsafe_b64encode(f"{day.isoformat()}|{tm_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
     try:
-        raw_events = db.query(Event).filter(Event.date_time >= today).order_by(Event.date_time).all()
-        rows = ""
-        unique_venues = set()
-        for e in raw_events:
-            # Venue Consolidation Logic
-            v_name = e.venue_name.strip()
-            if "Masquerade" in v_name:
-                v_filter = "The Masquerade"
-            elif any(x in v_name for x in ["Center Stage", "The Loft", "Vinyl"]):
-                v_filter = "Center Stage / Loft / Vinyl"
-            elif v_name.upper() == "THE EARL":
-                v_filter = "The EARL"
-            else:
-                v_filter = v_name
-                
-            unique_venues.add(v_filter)
-            rows += f"""<tr class="event-row" id="row-{e.tm_id}" data-id="{e.tm_id}" data-date="{e.date_time.isoformat()}" data-venue="{v_filter}" data-month="{e.date_time.month-1}" data-content="{e.name.upper()}">
-                <td><button class="star-btn" onclick="toggleStar('{e.tm_id}')">★</button></td>
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, tm_id = raw.split("|", 1)
+        return date.fromisoformat(day), tm_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def upcoming_query(session, columns, start=None, end=None, venue=None, q=None, ids=None, after=None):
+    # Shared by /events, /search and the listing; ordered for keyset pagination on (date_time, tm_id)
+    query = select(*columns).where(Event.date_time >= (start or dates.atl_today()), Event.expired_at.is_(None))
+    if end: query = query.where(Event.date_time <= end)
+    # Accepts a canonical ID or any spelling of the venue
+    if venue: query = query.where(Event.venue_key == venues.canonical_key(venue))
+    if q: query = query.where(search_index.condition(session, q))
+    if ids is not None: query = query.where(Event.tm_id.in_(ids))
+    if after: query = query.where(tuple_(Event.date_time, Event.tm_id) > decode_cursor(after))
+    return query.order_by(Event.date_time, Event.tm_id)
+
+def page_headers(request, rows, limit, key=lambda r: (r.date_time, r.tm_id)):
+    # rows were read with limit + 1; the extra one only says there is a next page
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+        params = dict(request.query_params, after=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.replace_query_params(**params)}>; rel="next"'
+    return rows, headers
+
+@app.get("/events")
+async def list_events(request: Request, after: str = None, limit: int = None, start: date = None, end: date = None, venue: str = None, fields: str = None, session: AsyncSession = Depends(get_session)):
+    names = list(EVENT_FIELDS) if not fields else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in EVENT_FIELDS]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested")
+
+    today = dates.atl_today()
+    # Upcoming shows only: a past start would reach expired rows not yet archived
+    start = max(start or today, today)
+    select_columns = [Event.date_time, Event.tm_id] + [EVENT_FIELDS[f] for f in names]
+    query = upcoming_query(session, select_columns, start, end, venue, after=after)
+    if not request.query_params:
+        # The call the clients make: cached per data version and served with an
+        # ETag / Last-Modified, so polling an unchanged schedule is a 304
+        await cache.refresh(read_data_version)
+
+        async def render():
+            rows = (await session.execute(query)).all()
+            return cache.CachedBody("".join(iter_events_json(names, rows)), "application/json", atl_midnight(today))
+
+        return cache.respond(request, await cache.get_or_render_async("events", today, render))
+    headers = {}
+    if limit is None and after is None:
+        # Callers that don't page (static/index1.html, the Flutter app) read one
+        # response and expect every upcoming show in it
+        rows = (await session.execute(query)).all()
+    else:
+        # Keyset pagination on (date_time, tm_id): always a range scan, never an OFFSET
+        limit = max(1, min(limit or EVENTS_PAGE_SIZE, MAX_PAGE_SIZE))
+        rows = (await session.execute(query.limit(limit + 1))).all()
+        rows, headers = page_headers(request, rows, limit, key=lambda r: (r[0], r[1]))
+    return StreamingResponse(iter_events_json(names, rows), media_type="application/json", headers=headers)
+
+def row_json(r):
+    # One show as the /search and /history JSON return it
+    return {"id": r.tm_id, "name": r.name, "date_time": r.date_time.isoformat(), "venue_name": r.venue_name,
+            "venue_key": r.venue_key, "ticket_url": r.ticket_url}
+
+def iter_events_json(names, rows):
+    # rows lead with (date_time, tm_id) for the cursor; the fields follow
+    yield "["
+    for i, r in enumerate(rows):
+        item = {}
+        for f, value in zip(names, r[2:]):
+            item[f] = value.isoformat() if isinstance(value, date) else value
+        yield ("," if i else "") + json.dumps(item, separators=(",", ":"))
+    yield "]"
+
+LISTING_PAGE_ROWS = 100
+LISTING_CHUNK_ROWS = 50
+MAX_STARRED_IDS = 500
+ROW_COLUMNS = [Event.tm_id, Event.name, Event.date_time, Event.venue_name, Event.venue_key, Event.ticket_url]
+
+@app.get("/search")
+async def search(request: Request, q: str = None, venue: str = None, start: date = None, end: date = None, ids: str = None, after: str = None, limit: int = LISTING_PAGE_ROWS, format: str = "html", session: AsyncSession = Depends(get_session)):
+    # Backs the listing page: the same filters its controls offer, one window at a time
+    if format not in ("html", "json"):
+        raise HTTPException(status_code=400, detail="format must be html or json")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    today = dates.atl_today()
+    start = max(start or today, today)
+    if venue == "all": venue = None
+    # Starred shows live in the browser's localStorage, so the page sends their IDs
+    id_list = None
+    if ids is not None:
+        id_list = [i for i in ids.split(",") if i][:MAX_STARRED_IDS]
+
+    q = (q or "").strip()
+    corrected = None
+    rows = (await session.execute(upcoming_query(session, ROW_COLUMNS, start, end, venue, q, id_list, after).limit(limit + 1))).all()
+    # Nothing matched as typed: retry once with misspelled words corrected
+    if not rows and q:
+        corrected = await session.run_sync(search_index.correct, q)
+        if corrected != q:
+            rows = (await session.execute(upcoming_query(session, ROW_COLUMNS, start, end, venue, corrected, id_list, after).limit(limit + 1))).all()
+    rows, headers = page_headers(request, rows, limit)
+    headers["Cache-Control"] = "no-cache"
+    if corrected and corrected != q: headers["X-Search-Corrected"] = corrected
+
+    if format == "json":
+        return Response(json.dumps([row_json(r) for r in rows], separators=(",", ":")), media_type="application/json", headers=headers)
+    return HTMLResponse("".join(render_row(r) for r in rows), headers=headers)
+
+def history_query(start=None, end=None, venue=None, q=None, after=None):
+    # Shows that already happened: the archive plus the last few days still in
+    # events. Newest first, keyset-paginated on (date_time, tm_id) descending.
+    today = dates.atl_today()
+    words = search_index.tokens(q)
+    parts = []
+    for model in (Event, ArchivedEvent):
+        part = select(model.tm_id, model.name, model.date_time, model.venue_name, model.venue_key, model.ticket_url)
+        part = part.where(model.date_time < today, model.expired_at.is_(None))
+        # A date range lets Postgres skip the archive partitions outside it
+        if start: part = part.where(model.date_time >= start)
+        if end: part = part.where(model.date_time <= end)
+        if venue: part = part.where(model.venue_key == venues.canonical_key(venue))
+        if words: part = part.where(and_(*[or_(model.name.ilike(f"%{w}%"), model.venue_name.ilike(f"%{w}%")) for w in words]))
+        if after: part = part.where(tuple_(model.date_time, model.tm_id) < decode_cursor(after))
+        parts.append(part)
+    history = union_all(*parts).subquery()
+    return select(history).order_by(history.c.date_time.desc(), history.c.tm_id.desc())
+
+@app.get("/history")
+async def history(request: Request, venue: str = None, q: str = None, year: int = None, start: date = None, end: date = None, after: str = None, limit: int = 100, session: AsyncSession = Depends(get_session)):
+    # "What played at the EARL last year": /history?venue=earl&year=2025
+    if year is not None:
+        try:
+            start, end = max(start or date.min, date(year, 1, 1)), min(end or date.max, date(year, 12, 31))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid year")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = (await session.execute(history_query(start, end, venue, q, after).limit(limit + 1))).all()
+    rows, headers = page_headers(request, rows, limit)
+    return Response(json.dumps([row_json(r) for r in rows], separators=(",", ":")), media_type="application/json", headers=headers)
+
+async def upcoming_venues(session, today):
+    # Distinct canonical venues straight off the (venue_key, date_time) index
+    rows = (await session.execute(select(Event.venue_key, func.min(Event.venue_name)).where(Event.date_time >= today, Event.expired_at.is_(None)).group_by(Event.venue_key))).all()
+    return sorted(((key, venues.display_name(key, name)) for key, name in rows), key=lambda v: v[1].lower())
+
+async def render_venue_options(session, today):
+    return '<option value="all">All Venues</option>' + "".join([f'<option value="{html.escape(key or "")}">{html.escape(name)}</option>' for key, name in await upcoming_venues(session, today)])
+
+def ticket_href(url):
+    # Only http(s) links reach the page; a pasted "javascript:" URL becomes "#"
+    if not url or not re.match(r"https?://", url, re.I):
+        return "#"
+    return html.escape(url)
+
+def render_row(e):
+    # Names, venues and links come from pastes and scrapes, so all of it is
+    # escaped; the star button reads the ID back from data-id, not from JS source
+    tm_id = html.escape(e.tm_id)
+    return f"""<tr class="event-row" id="row-{tm_id}" data-id="{tm_id}">
+                <td><button class="star-btn" onclick="toggleStar(this.closest('tr').dataset.id)">★</button></td>
                 <td style="width:110px; font-weight:700; color:#888;">{e.date_time.strftime('%a, %b %d')}</td>
-                <td><strong>{e.name}</strong></td>
-                <td>{e.venue_name}</td>
-                <td><a href="{e.ticket_url or '#'}" target="_blank" style="color:var(--primary); font-weight:bold; text-decoration:none;">Tickets</a></td></tr>"""
-        
-        venue_options = f'<option value="all">All Venues</option>' + "".join([f'<option value="{v}">{v}</option>' for v in sorted(list(unique_venues))])
+                <td><strong>{html.escape(e.name or "")}</strong></td>
+                <td>{html.escape(e.venue_name or "")}</td>
+                <td><a href="{ticket_href(e.ticket_url)}" target="_blank" rel="noopener" style="color:var(--primary); font-weight:bold; text-decoration:none;">Tickets</a></td></tr>"""
+
+async def iter_listing(today):
+    # Head and controls go out first; the first window of rows follows in
+    # batches, and the page pulls anything past it from /search on demand.
+    # Opens its own session: it is still running after the handler returns.
+    async with AsyncSessionLocal() as session:
+        venue_options = await render_venue_options(session, today)
 
-        return f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>ATL SHOW FINDER</title>{COMMON_STYLE}</head>
+        yield f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>ATL SHOW FINDER</title>{COMMON_STYLE}</head>
             <body><header><h1>ATL SHOW FINDER</h1></header>
                 <div class="container">
                     <div class="controls-box">
@@ -110,11 +341,32 @@ def read_root():
                             <button class="tab-btn" onclick="moveDate(1)">→</button>
                         </div>
                     </div>
-                    <table><tbody id="event-body">{rows}</tbody></table>
+                    <table><tbody id="event-body">"""
+
+        next_cursor = None
+        batch = []
+        i = 0
+        rows = await session.stream(upcoming_query(session, ROW_COLUMNS, today).limit(LISTING_PAGE_ROWS + 1).execution_options(yield_per=LISTING_CHUNK_ROWS))
+        async for e in rows:
+            if i == LISTING_PAGE_ROWS:
+                next_cursor = encode_cursor(last.date_time, last.tm_id)
+                break
+            batch.append(render_row(e))
+            last = e
+            i += 1
+            if len(batch) >= LISTING_CHUNK_ROWS:
+                yield "".join(batch)
+                batch = []
+        if batch:
+            yield "".join(batch)
+
+        yield f"""</tbody></table>
+                    <div id="more" style="height:1px;"></div>
                 </div>
                 <script>
-                    const allRows = Array.from(document.getElementsByClassName('event-row'));
+                    const body = document.getElementById('event-body');
                     let currentTab = 'all', starredOnly = false, viewingDate = new Date();
+                    let nextCursor = {json.dumps(next_cursor)}, loading = false, requestSeq = 0, searchTimer = null;
                     viewingDate.setHours(0,0,0,0);
                     
                     // --- PERSISTENCE LOGIC ---
@@ -139,28 +391,50 @@ def read_root():
                         }});
                     }}
 
-                    function runFilters() {{
-                        const q = document.getElementById('search').value.toUpperCase();
+                    function isoDay(d) {{
+                        return d.getFullYear() + '-' + String(d.getMonth() + 1).padStart(2, '0') + '-' + String(d.getDate()).padStart(2, '0');
+                    }}
+
+                    function searchParams() {{
+                        const p = new URLSearchParams({{format: 'html'}});
+                        const q = document.getElementById('search').value.trim();
                         const vSel = document.getElementById('venue-select').value;
-                        const vMonth = viewingDate.getMonth();
-                        const vDayStr = viewingDate.toISOString().split('T')[0];
-
-                        allRows.forEach(row => {{
-                            const id = row.dataset.id;
-                            const isStarred = starredIds.has(id);
-                            const matchTxt = !q || row.dataset.content.includes(q);
-                            const matchVen = vSel === 'all' || row.dataset.venue === vSel;
-                            
-                            let show = matchTxt && matchVen;
-                            if (show) {{
-                                if (starredOnly) show = isStarred;
-                                else if (currentTab === 'today') show = row.dataset.date === vDayStr;
-                                else if (currentTab === 'month') show = parseInt(row.dataset.month) === vMonth;
-                            }}
-                            row.className = show ? 'event-row' + (isStarred ? ' is-highlighted' : '') : 'event-row hidden';
-                        }});
+                        if (q) p.set('q', q);
+                        if (vSel !== 'all') p.set('venue', vSel);
+                        if (starredOnly) p.set('ids', Array.from(starredIds).join(','));
+                        else if (currentTab === 'today') {{ p.set('start', isoDay(viewingDate)); p.set('end', isoDay(viewingDate)); }}
+                        else if (currentTab === 'month') {{
+                            p.set('start', isoDay(new Date(viewingDate.getFullYear(), viewingDate.getMonth(), 1)));
+                            p.set('end', isoDay(new Date(viewingDate.getFullYear(), viewingDate.getMonth() + 1, 0)));
+                        }}
+                        return p;
+                    }}
+
+                    // reset=true replaces the table for new filters; otherwise appends the next window
+                    async function loadRows(reset) {{
+                        if (!reset && (!nextCursor || loading)) return;
+                        if (starredOnly && !starredIds.size) {{ body.innerHTML = ''; nextCursor = null; return; }}
+                        const seq = ++requestSeq, p = searchParams();
+                        if (!reset) p.set('after', nextCursor);
+                        loading = true;
+                        try {{
+                            const res = await fetch('/search?' + p);
+                            const html = await res.text();
+                            // A newer filter change already superseded this response
+                            if (seq !== requestSeq) return;
+                            if (reset) body.innerHTML = html;
+                            else body.insertAdjacentHTML('beforeend', html);
+                            nextCursor = res.headers.get('X-Next-Cursor');
+                            applyStarStyles();
+                        }} finally {{
+                            if (seq === requestSeq) loading = false;
+                        }}
+                    }}
+
+                    function runFilters() {{
                         document.getElementById('nav-row').style.display = (currentTab === 'all' || starredOnly) ? 'none' : 'flex';
                         document.getElementById('view-label').innerText = currentTab === 'today' ? viewingDate.toLocaleDateString('en-US', {{month:'short', day:'numeric'}}) : viewingDate.toLocaleDateString('en-US', {{month:'long'}});
+                        loadRows(true);
                     }}
 
                     window.moveDate = (dir) => {{ 
@@ -178,37 +452,87 @@ def read_root():
                         runFilters();
                     }}));
 
-                    document.getElementById('search').addEventListener('input', runFilters);
+                    document.getElementById('search').addEventListener('input', () => {{
+                        clearTimeout(searchTimer);
+                        searchTimer = setTimeout(runFilters, 200);
+                    }});
                     document.getElementById('venue-select').addEventListener('change', runFilters);
                     document.getElementById('fav-filter').addEventListener('click', function() {{ 
                         starredOnly = !starredOnly; this.classList.toggle('active'); runFilters(); 
                     }});
 
+                    // Fetch the next window as the end of the table scrolls into view
+                    new IntersectionObserver(entries => {{
+                        if (entries[0].isIntersecting) loadRows(false);
+                    }}, {{rootMargin: '800px'}}).observe(document.getElementById('more'));
+
                     // Initialize
                     applyStarStyles();
-                    runFilters();
                 </script></body></html>"""
-    finally:
-        db.close()
+
+# Sortable columns of the admin listing
+# Venue sorts on the canonical key, so every spelling of one venue sits together
+ADMIN_SORTS = {"date": Event.date_time, "name": Event.name, "venue": Event.venue_key}
+ADMIN_PAGE_SIZE = 100
+
+def encode_admin_cursor(value, tm_id):
+    raw = json.dumps([value.isoformat() if isinstance(value, date) else value, tm_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_admin_cursor(cursor, sort):
+    try:
+        value, tm_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (date.fromisoformat(value) if sort == "date" else value), tm_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/theking/shows")
+async def admin_shows(venue: str = None, sort: str = "date", order: str = "asc", after: str = None, limit: int = ADMIN_PAGE_SIZE, session: AsyncSession = Depends(get_session)):
+    # One page of manual shows; the first page also carries the total and venue list
+    if sort not in ADMIN_SORTS or order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="sort must be date, name or venue and order asc or desc")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    column = ADMIN_SORTS[sort]
+    # Accepts a canonical ID or any spelling of the venue, like the public listing
+    manual = [Event.source == "manual"] + ([Event.venue_key == venues.canonical_key(venue)] if venue else [])
+    query = select(Event.tm_id, Event.name, Event.date_time, Event.venue_name, column.label("sort_key")).where(*manual)
+    page = {}
+    if not after:
+        page["total"] = await session.scalar(select(func.count()).select_from(Event).where(*manual))
+        venue_rows = (await session.execute(select(Event.venue_key, func.min(Event.venue_name)).where(Event.source == "manual").group_by(Event.venue_key))).all()
+        page["venues"] = sorted(({"key": key, "name": venues.display_name(key, name)} for key, name in venue_rows), key=lambda v: v["name"].lower())
+    else:
+        # Keyset on (sort column, tm_id) in either direction
+        key = tuple_(column, Event.tm_id)
+        cursor = decode_admin_cursor(after, sort)
+        query = query.where(key > cursor if order == "asc" else key < cursor)
+    ordering = [column, Event.tm_id] if order == "asc" else [column.desc(), Event.tm_id.desc()]
+    rows = (await session.execute(query.order_by(*ordering).limit(limit + 1))).all()
+    page["next"] = encode_admin_cursor(rows[limit - 1].sort_key, rows[limit - 1].tm_id) if len(rows) > limit else None
+    page["rows"] = [{"id": r.tm_id, "name": r.name, "date": r.date_time.isoformat(), "venue": r.venue_name} for r in rows[:limit]]
+    return page
 
 @app.get("/theking", response_class=HTMLResponse)
-def admin_page():
-    db = SessionLocal()
-    manual_shows = db.query(Event).filter(Event.tm_id.like('manual-%')).order_by(Event.date_time).all()
-    unique_venues = sorted(list(set(s.venue_name for s in manual_shows)))
-    db.close()
-    
-    venue_options = '<option value="all">All Venues</option>' + "".join([f'<option value="{v}">{v}</option>' for v in unique_venues])
-    rows = "".join([f'<tr class="admin-row" data-venue="{s.venue_name}"><td><input type="checkbox" class="show-check" value="{s.tm_id}"></td><td>{s.date_time}</td><td>{s.name}</td><td>{s.venue_name}</td></tr>' for s in manual_shows])
-
-    return f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Admin</title>{COMMON_STYLE}</head>
+async def admin_page():
+    # Just the shell; the stored shows table loads a page at a time from /theking/shows
+    return f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Admin</title>{COMMON_STYLE}
+    <style>
+        #admin-viewport {{ height: 600px; overflow-y: auto; border-radius: 12px; }}
+        #admin-viewport table {{ table-layout: fixed; }}
+        #admin-viewport th {{ position: sticky; top: 0; background: #fff; z-index: 1; cursor: pointer; }}
+        .admin-row td {{ height: 40px; padding-top: 0; padding-bottom: 0; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+    </style></head>
     <body><div class="container">
         <header><h1>ADMIN PANEL</h1></header>
         
         <div class="controls-box">
             <h3>Option 1: Manual Parser</h3>
-            <p style="font-size:0.8rem; color:#888;">Format: Band Name | Date | Venue</p>
+            <p style="font-size:0.8rem; color:#888;">Format: Band Name | Date | Venue, "Mar 6 - Band @ Venue", or a copied venue calendar</p>
             <textarea id="bulk-input" style="height:100px;"></textarea>
+            <div style="display:flex; gap:10px; margin-top:10px;">
+                <input type="text" id="bulk-venue" class="search-input" placeholder="Venue for lines without one" style="flex:1;">
+                <input type="file" id="bulk-file" accept=".txt,.csv,.tsv,text/plain" style="align-self:center;">
+            </div>
             <button class="admin-btn" onclick="quickParse()" style="background:var(--primary);">Process List</button>
         </div>
 
@@ -225,102 +549,231 @@ def admin_page():
         
         <div class="controls-box">
             <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
-                <h3 style="margin:0;">Stored Manual Shows</h3>
+                <h3 style="margin:0;">Stored Manual Shows <span id="admin-count" style="font-size:0.8rem; color:#888; font-weight:normal;"></span></h3>
                 <div style="display:flex; gap:10px;">
-                    <select id="admin-venue-filter" class="search-input" style="height:38px;">{venue_options}</select>
+                    <select id="admin-venue-filter" class="search-input" style="height:38px;"><option value="all">All Venues</option></select>
                     <button class="admin-btn" style="background:var(--danger); margin:0;" onclick="deleteSelected()">Delete Selected</button>
                 </div>
             </div>
-            <table>
-                <thead>
-                    <tr>
-                        <th><input type="checkbox" id="select-all" onclick="toggleAll(this)"></th>
-                        <th>Date</th><th>Band</th><th>Venue</th>
-                    </tr>
-                </thead>
-                <tbody id="admin-tbody">{rows}</tbody>
-            </table>
+            <div id="admin-viewport">
+                <table>
+                    <thead>
+                        <tr>
+                            <th style="width:40px;"><input type="checkbox" id="select-all" onclick="toggleAll(this)"></th>
+                            <th data-sort="date" style="width:120px;">Date</th><th data-sort="name">Band</th><th data-sort="venue" style="width:220px;">Venue</th>
+                        </tr>
+                    </thead>
+                    <tbody id="admin-tbody"></tbody>
+                </table>
+            </div>
             <br><a href="/" style="display:block; text-align:center;">Back to Home</a>
         </div>
     </div>
     <script>
-        function quickParse() {{
-            const raw = document.getElementById('bulk-input').value;
-            const list = document.getElementById('bulk-list');
-            list.innerHTML = '';
-            raw.split('\\n').forEach(line => {{
-                if(!line.includes('|')) return;
-                const [n, d, v] = line.split('|').map(s => s.trim());
-                const div = document.createElement('div');
-                div.className = 'bulk-row'; div.style="display:flex; gap:10px; margin-bottom:5px;";
-                div.innerHTML = `<input type="text" class="b-name" value="${{n}}" style="flex:2"><input type="text" class="b-date" value="${{d}}" style="flex:1"><input type="text" class="b-venue" value="${{v}}" style="flex:2">`;
-                list.appendChild(div);
-            }});
+        const PREVIEW_ROWS = 300;
+        let parsedRows = [];
+
+        function esc(s) {{
+            return String(s).replace(/[&<>"]/g, c => ({{'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}})[c]);
+        }}
+
+        // The server parses the paste; the page only draws the preview
+        async function quickParse() {{
+            const form = new FormData();
+            const file = document.getElementById('bulk-file').files[0];
+            if (file) form.append('file', file);
+            else form.append('text', document.getElementById('bulk-input').value);
+            const venue = document.getElementById('bulk-venue').value.trim();
+            if (venue) form.append('venue', venue);
+
+            const res = await fetch('/theking/parse', {{ method: 'POST', body: form }});
+            const data = await res.json();
+            if (!res.ok) return alert(data.detail || 'Could not parse');
+            parsedRows = data.rows;
+
+            const rows = data.rows.slice(0, PREVIEW_ROWS).map(r => `<tr><td>${{r.line}}</td><td>${{r.date}}</td><td>${{esc(r.name)}}</td><td>${{esc(r.venue)}}</td></tr>`).join('');
+            const more = data.rows.length > PREVIEW_ROWS ? `<p>…and ${{data.rows.length - PREVIEW_ROWS}} more</p>` : '';
+            const errors = data.errors.map(e => `<li>line ${{e.line}}: ${{esc(e.reason)}} <code>${{esc(e.text)}}</code></li>`).join('');
+            document.getElementById('bulk-list').innerHTML =
+                `<p><b>${{data.rows.length}}</b> shows ready, <b>${{data.errors.length}}</b> lines skipped</p>` +
+                `<table><thead><tr><th>Line</th><th>Date</th><th>Band</th><th>Venue</th></tr></thead><tbody>${{rows}}</tbody></table>${{more}}` +
+                (errors ? `<ul style="color:var(--danger); font-size:0.8rem;">${{errors}}</ul>` : '');
             document.getElementById('preview-area').classList.remove('hidden');
         }}
 
         async function uploadBulk() {{
-            const payload = Array.from(document.querySelectorAll('.bulk-row')).map(r => ({{
-                name: r.querySelector('.b-name').value, date: r.querySelector('.b-date').value, venue: r.querySelector('.b-venue').value
-            }}));
-            await fetch('/theking/bulk-save', {{ method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(payload) }});
-            location.reload();
+            if (!parsedRows.length) return alert('Nothing to save');
+            await saveAndReport(parsedRows.map(r => ({{ name: r.name, date: r.date, venue: r.venue }})));
+        }}
+
+        async function saveAndReport(payload) {{
+            const res = await (await fetch('/theking/bulk-save', {{ method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(payload) }})).json();
+            let msg = `${{res.inserted}} added, ${{res.updated}} updated, ${{res.merged}} merged into existing shows`;
+            if (res.rejected) msg += `\\n${{res.rejected}} rejected:\\n` + res.errors.map(e => `line ${{e.line}}: ${{e.reason}}`).join('\\n');
+            alert(msg);
+            parsedRows = [];
+            document.getElementById('preview-area').classList.add('hidden');
+            loadShows(true);
         }}
 
         async function injectJSON() {{
             try {{
-                const data = JSON.parse(document.getElementById('json-input').value);
-                await fetch('/theking/bulk-save', {{ method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(data) }});
-                location.reload();
-            }} catch(e) {{ alert("Invalid JSON"); }}
+                var data = JSON.parse(document.getElementById('json-input').value);
+            }} catch(e) {{ return alert("Invalid JSON"); }}
+            await saveAndReport(data);
         }}
         
-        function toggleAll(master) {{
-            const checkboxes = document.querySelectorAll('.show-check');
-            checkboxes.forEach(cb => {{
-                if (cb.closest('tr').style.display !== 'none') cb.checked = master.checked;
-            }});
+        // --- STORED SHOWS: a page at a time from /theking/shows, only visible rows in the DOM ---
+        const ROW_H = 41, BUFFER = 10;
+        const viewport = document.getElementById('admin-viewport'), tbody = document.getElementById('admin-tbody');
+        let shows = [], total = 0, nextCursor = null, loadingShows = false, listSeq = 0;
+        let sortBy = 'date', sortOrder = 'asc';
+        const selected = new Set();
+
+        function showParams() {{
+            const p = new URLSearchParams({{ sort: sortBy, order: sortOrder }});
+            const venue = document.getElementById('admin-venue-filter').value;
+            if (venue !== 'all') p.set('venue', venue);
+            return p;
         }}
 
-        document.getElementById('admin-venue-filter').addEventListener('change', function() {{
-            const val = this.value;
-            document.querySelectorAll('.admin-row').forEach(row => {{
-                row.style.display = (val === 'all' || row.dataset.venue === val) ? '' : 'none';
-            }});
+        function fillVenues(list) {{
+            // {{key, name}} pairs: one entry per canonical venue, however it was spelled
+            const sel = document.getElementById('admin-venue-filter'), current = sel.value;
+            sel.innerHTML = '<option value="all">All Venues</option>' + list.map(v => `<option value="${{esc(v.key)}}">${{esc(v.name)}}</option>`).join('');
+            sel.value = list.some(v => v.key === current) ? current : 'all';
+        }}
+
+        // reset=true starts over for a new filter or sort; otherwise appends the next page
+        async function loadShows(reset) {{
+            if (!reset && (!nextCursor || loadingShows)) return;
+            const seq = reset ? ++listSeq : listSeq, p = showParams();
+            if (!reset) p.set('after', nextCursor);
+            loadingShows = true;
+            try {{
+                const data = await (await fetch('/theking/shows?' + p)).json();
+                if (seq !== listSeq) return;
+                if (reset) {{
+                    shows = data.rows; total = data.total; selected.clear();
+                    document.getElementById('select-all').checked = false;
+                    fillVenues(data.venues);
+                    viewport.scrollTop = 0;
+                }} else shows = shows.concat(data.rows);
+                nextCursor = data.next;
+            }} finally {{
+                if (seq === listSeq) loadingShows = false;
+            }}
+            renderWindow();
+        }}
+
+        function renderWindow() {{
+            const first = Math.max(0, Math.floor(viewport.scrollTop / ROW_H) - BUFFER);
+            const last = Math.min(shows.length, first + Math.ceil(viewport.clientHeight / ROW_H) + 2 * BUFFER);
+            tbody.innerHTML = `<tr style="height:${{first * ROW_H}}px"></tr>` +
+                shows.slice(first, last).map(s => `<tr class="admin-row"><td><input type="checkbox" class="show-check" value="${{esc(s.id)}}" ${{selected.has(s.id) ? 'checked' : ''}}></td><td>${{s.date}}</td><td title="${{esc(s.name)}}">${{esc(s.name)}}</td><td>${{esc(s.venue)}}</td></tr>`).join('') +
+                `<tr style="height:${{(shows.length - last) * ROW_H}}px"></tr>`;
+            document.getElementById('admin-count').innerText = `(${{shows.length}} of ${{total}} loaded)`;
+            if (last >= shows.length - BUFFER) loadShows(false);
+        }}
+
+        let frame = null;
+        viewport.addEventListener('scroll', () => {{
+            if (!frame) frame = requestAnimationFrame(() => {{ frame = null; renderWindow(); }});
+        }});
+
+        tbody.addEventListener('change', e => {{
+            if (!e.target.classList.contains('show-check')) return;
+            if (e.target.checked) selected.add(e.target.value);
+            else selected.delete(e.target.value);
         }});
 
+        function toggleAll(master) {{
+            shows.forEach(s => master.checked ? selected.add(s.id) : selected.delete(s.id));
+            renderWindow();
+        }}
+
+        document.getElementById('admin-venue-filter').addEventListener('change', () => loadShows(true));
+
+        document.querySelectorAll('#admin-viewport th[data-sort]').forEach(th => th.addEventListener('click', () => {{
+            if (sortBy === th.dataset.sort) sortOrder = sortOrder === 'asc' ? 'desc' : 'asc';
+            else {{ sortBy = th.dataset.sort; sortOrder = 'asc'; }}
+            loadShows(true);
+        }}));
+
         async function deleteSelected() {{
-            const ids = Array.from(document.querySelectorAll('.show-check:checked')).map(cb => cb.value);
-            if(ids.length > 0 && confirm("Delete selected?")) {{
-                await fetch('/theking/delete-bulk', {{ method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(ids) }});
-                location.reload();
+            const ids = Array.from(selected);
+            if(ids.length > 0 && confirm(`Delete ${{ids.length}} selected?`)) {{
+                const res = await (await fetch('/theking/delete-bulk', {{ method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(ids) }})).json();
+                // Drop them from the loaded pages instead of reloading everything
+                shows = shows.filter(s => !selected.has(s.id));
+                total -= res.deleted;
+                selected.clear();
+                document.getElementById('select-all').checked = false;
+                renderWindow();
             }}
         }}
+
+        loadShows(true);
     </script></body></html>"""
 
+@app.get("/theking/sync-status")
+async def sync_status():
+    return scheduler.status
+
+def parse_manual_row(item, day):
+    name = str(item.get('name') or '').strip()
+    venue = str(item.get('venue') or '').strip()
+    if not name: raise ValueError("missing name")
+    if not venue: raise ValueError("missing venue")
+    # day is this line's entry from dates.parse_many: a date or its DateParseError
+    if isinstance(day, Exception): raise day
+    tm_id = f"manual-{name.replace(' ', '')}-{day.isoformat()}"
+    return {"tm_id": tm_id, "name": name, "date_time": day, "venue_name": venue, "ticket_url": None, "source": "manual", "venue_key": venues.canonical_key(venue)}
+
+@app.post("/theking/parse")
+def parse_paste(text: str = Form(None), file: UploadFile = File(None), venue: str = Form(None)):
+    # Preview for the paste box: read the text or upload line by line and hand
+    # back the shows found plus a reason for each line that was skipped
+    if file is not None:
+        lines = io.TextIOWrapper(file.file, encoding="utf-8", errors="replace")
+    elif text:
+        lines = io.StringIO(text)
+    else:
+        raise HTTPException(status_code=400, detail="Paste some text or choose a file")
+    rows, errors = [], []
+    for item in paste_parser.parse_lines(lines, venue):
+        (errors if "reason" in item else rows).append(item)
+    return {"rows": rows, "errors": errors}
+
 @app.post("/theking/bulk-save")
-async def bulk_save(data: list = Body(...)):
-    db = SessionLocal()
-    current_year = 2026
-    for item in data:
+async def bulk_save(data: list = Body(...), session: AsyncSession = Depends(get_session)):
+    # Parse the whole paste before touching the database, keeping a reason for
+    # every line that can't be used, then write it all as one set
+    rows, rejected = {}, []
+    days = dates.parse_many([str(item.get('date') or '') if isinstance(item, dict) else '' for item in data])
+    for line, (item, day) in enumerate(zip(data, days), 1):
         try:
-            ds = item['date'].strip()
-            if '-' in ds:
-                dt = datetime.strptime(ds, "%m-%d-%Y").date()
-            else:
-                fmt = "%Y %b %d" if len(ds.split()[0]) == 3 else "%Y %B %d"
-                dt = datetime.strptime(f"{current_year} {ds}", fmt).date()
-            
-            if dt < date.today(): dt = dt.replace(year=current_year + 1)
-            tm_id = f"manual-{item['name'].replace(' ', '')}-{dt.isoformat()}"
-            db.merge(Event(tm_id=tm_id, name=item['name'], date_time=dt, venue_name=item['venue']))
-        except: continue
-    db.commit(); db.close()
-    return {"status": "ok"}
+            if not isinstance(item, dict): raise ValueError("not an object")
+            row = parse_manual_row(item, day)
+        except ValueError as e:
+            rejected.append({"line": line, "reason": str(e)})
+            continue
+        rows[row["tm_id"]] = row
+    stats = {"inserted": 0, "updated": 0, "merged": 0}
+    if rows:
+        # Shows another feed already has fold into that record instead of
+        # duplicating it; dedup is shared with the sync collector, so it runs
+        # as sync ORM code on this session's connection
+        stats = await session.run_sync(dedup.write_with_dedup, list(rows.values()), dates.atl_today())
+        version = await session.run_sync(bump_version)
+        await session.commit()
+        cache.set_data_version(*version)
+    return {"status": "ok", **stats, "rejected": len(rejected), "errors": rejected}
 
 @app.post("/theking/delete-bulk")
-async def delete_bulk(ids: list = Body(...)):
-    db = SessionLocal()
-    db.query(Event).filter(Event.tm_id.in_(ids)).delete(synchronize_session=False)
-    db.commit(); db.close()
-    return {"status": "ok"}
\ No newline at end of file
+async def delete_bulk(ids: list = Body(...), session: AsyncSession = Depends(get_session)):
+    deleted = (await session.execute(delete(Event).where(Event.tm_id.in_(ids)))).rowcount
+    version = await session.run_sync(bump_version)
+    await session.commit()
+    cache.set_data_version(*version)
+    return {"status": "ok", "deleted": deleted}
\ No newline at end of file
@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from models import Base, Event, ArchivedEvent, venue_key
+
+# Each migration must be safe to re-run: a fresh database gets the full current
+# schema from step 1. Replicas starting together are serialised by migrate().
+
+def _add_column(conn, table, name, ddl):
+    if name not in {c['name'] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+def _create_table(conn):
+    Base.metadata.create_all(bind=conn, tables=[Event.__table__])
+
+def _sync_columns(conn):
+    _add_column(conn, "events", "content_hash", "VARCHAR")
+    _add_column(conn, "events", "expired_at", "DATE")
+
+def _source_and_indexes(conn):
+    _add_column(conn, "events", "source", "VARCHAR")
+    _add_column(conn, "events", "venue_key", "VARCHAR")
+    # Backfill from the ID schemes that used to be the only way to tell sources apart
+    conn.execute(text("""
+        UPDATE events SET source = CASE
+            WHEN tm_id LIKE 'manual-%' THEN 'manual'
+            WHEN tm_id LIKE 'man-%' THEN 'verified'
+            WHEN tm_id LIKE '529-%' THEN '529'
+            WHEN tm_id LIKE 'earl-%' THEN 'earl'
+            ELSE 'ticketmaster' END
+        WHERE source IS NULL"""))
+    # One UPDATE per distinct venue, not per row
+    venues = conn.execute(text("SELECT DISTINCT venue_name FROM events WHERE venue_key IS NULL")).scalars().all()
+    for v in venues:
+        conn.execute(text("UPDATE events SET venue_key = :k WHERE venue_name = :v AND venue_key IS NULL"), {"k": venue_key(v), "v": v})
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_date_time ON events (date_time)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_venue_date ON events (venue_name, date_time)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_venue_key_date ON events (venue_key, date_time)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_source_date ON events (source, date_time)"))
+
+def _canonical_venue_keys(conn):
+    # Re-key every venue through the alias table; cheap, it runs per distinct name
+    from venues import canonical_key
+    venues = conn.execute(text("SELECT DISTINCT venue_name FROM events")).scalars().all()
+    for v in venues:
+        conn.execute(text("UPDATE events SET venue_key = :k WHERE venue_name = :v"), {"k": canonical_key(v), "v": v})
+
+def _provenance(conn):
+    _add_column(conn, "events", "provenance", "TEXT")
+
+def _search_index(conn):
+    # Artist/venue search: SQLite keeps FTS5 tables in step with events through
+    # triggers; Postgres derives a tsvector column and maintains it itself
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("""
+            ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(venue_name, ''))) STORED"""))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_search ON events USING GIN (search_vector)"))
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_name_trgm ON events USING GIN (name gin_trgm_ops)"))
+        except Exception as e:
+            print(f"pg_trgm unavailable, substring search will scan: {e}")
+        return
+    if conn.dialect.name != "sqlite":
+        return
+    try:
+        # External-content tables keyed on events.rowid; VACUUM can renumber those,
+        # so run search_index.rebuild() after one
+        conn.execute(text("""CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            name, venue_name, content='events', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3')"""))
+        conn.execute(text("""CREATE VIRTUAL TABLE IF NOT EXISTS events_trgm USING fts5(
+            name, venue_name, content='events', content_rowid='rowid', tokenize='trigram')"""))
+        conn.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS events_fts_vocab USING fts5vocab(events_fts, 'row')"))
+    except Exception as e:
+        print(f"FTS5 unavailable, search falls back to LIKE: {e}")
+        return
+    for table in ("events_fts", "events_trgm"):
+        conn.execute(text(f"""CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON events BEGIN
+            INSERT INTO {table}(rowid, name, venue_name) VALUES (new.rowid, new.name, new.venue_name); END"""))
+        conn.execute(text(f"""CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON events BEGIN
+            INSERT INTO {table}({table}, rowid, name, venue_name) VALUES ('delete', old.rowid, old.name, old.venue_name); END"""))
+        conn.execute(text(f"""CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF name, venue_name ON events BEGIN
+            INSERT INTO {table}({table}, rowid, name, venue_name) VALUES ('delete', old.rowid, old.name, old.venue_name);
+            INSERT INTO {table}(rowid, name, venue_name) VALUES (new.rowid, new.name, new.venue_name); END"""))
+        conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+
+def _archive_table(conn):
+    # History table for archive.py. Postgres partitions it by month; archive.py
+    # adds each month's partition before moving rows into it, and the default
+    # partition catches anything that lands first.
+    if conn.dialect.name != "postgresql":
+        Base.metadata.create_all(bind=conn, tables=[ArchivedEvent.__table__])
+        return
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS events_archive (
+            tm_id VARCHAR NOT NULL, date_time DATE NOT NULL, name VARCHAR, venue_name VARCHAR,
+            ticket_url TEXT, source VARCHAR, venue_key VARCHAR, provenance TEXT,
+            expired_at DATE, archived_at DATE,
+            PRIMARY KEY (tm_id, date_time)
+        ) PARTITION BY RANGE (date_time)"""))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS events_archive_default PARTITION OF events_archive DEFAULT"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_archive_venue_key_date ON events_archive (venue_key, date_time)"))
+
+def _data_version(conn):
+    # Shared cache version (database.bump_version); one row, id 1
+    conn.execute(text("CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL, updated_at FLOAT NOT NULL)"))
+    conn.execute(text("INSERT INTO data_version (id, version, updated_at) SELECT 1, 0, :t WHERE NOT EXISTS (SELECT 1 FROM data_version WHERE id = 1)"),
+                 {"t": datetime.now(timezone.utc).timestamp()})
+
+MIGRATIONS = [
+    (1, "create events table", _create_table),
+    (2, "content_hash and expired_at for incremental sync", _sync_columns),
+    (3, "source and venue_key columns, listing indexes", _source_and_indexes),
+    (4, "canonical venue IDs from the venue alias table", _canonical_venue_keys),
+    (5, "provenance of merged duplicate events", _provenance),
+    (6, "full-text search index over lineups and venues", _search_index),
+    (7, "events_archive history table, monthly partitions on Postgres", _archive_table),
+    (8, "data_version row shared by every replica", _data_version),
+]
+
+# Same scheme as scheduler.ADVISORY_LOCK_KEY ("ATLS"), one key per job
+MIGRATION_LOCK_KEY = 0x41544C4D  # "ATLM"
+
+def _applied(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, description VARCHAR, applied_at VARCHAR)"))
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+def migrate(engine):
+    lock = None
+    if engine.dialect.name == "postgresql":
+        # Replicas starting together queue here; the later ones then find
+        # every step already applied
+        lock = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock.execute(text("SELECT pg_advisory_lock(:k)"), {"k": MIGRATION_LOCK_KEY})
+    try:
+        applied = _applied(engine)
+        for version, description, step in MIGRATIONS:
+            if version in applied:
+                continue
+            with engine.begin() as conn:
+                if conn.dialect.name == "postgresql":
+                    # Backfills and index builds can outlast the engine's statement timeout
+                    conn.execute(text("SET LOCAL statement_timeout = 0"))
+                step(conn)
+                conn.execute(text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t) ON CONFLICT (version) DO NOTHING"),
+                             {"v": version, "d": description, "t": datetime.now(timezone.utc).isoformat(timespec="seconds")})
+            print(f"Applied migration {version}: {description}")
+    finally:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": MIGRATION_LOCK_KEY})
+            lock.close()
+
+if __name__ == "__main__":
+    from database import engine
+    migrate(engine)
@@ -0,0 +1,60 @@
+import hashlib
+import re
+from sqlalchemy import Column, String, Date, Text, Index
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+# The one Event model; every module imports it from here
+class Event(Base):
+    __tablename__ = 'events'
+    tm_id = Column(String, primary_key=True)
+    name = Column(String)
+    date_time = Column(Date)
+    venue_name = Column(String)
+    ticket_url = Column(Text)
+    # Which feed owns the row: a sources.REGISTRY name, or "manual" for /theking
+    source = Column(String)
+    venue_key = Column(String)
+    # JSON list of {"source", "tm_id"} for every feed folded into this row
+    provenance = Column(Text)
+    content_hash = Column(String)
+    expired_at = Column(Date)
+
+    __table_args__ = (
+        Index('ix_events_date_time', 'date_time'),
+        Index('ix_events_venue_date', 'venue_name', 'date_time'),
+        Index('ix_events_venue_key_date', 'venue_key', 'date_time'),
+        Index('ix_events_source_date', 'source', 'date_time'),
+    )
+
+# Past shows, moved out of events by archive.py. On Postgres the table is
+# range-partitioned by month, so the key has to include date_time.
+class ArchivedEvent(Base):
+    __tablename__ = 'events_archive'
+    tm_id = Column(String, primary_key=True)
+    date_time = Column(Date, primary_key=True)
+    name = Column(String)
+    venue_name = Column(String)
+    ticket_url = Column(Text)
+    source = Column(String)
+    venue_key = Column(String)
+    provenance = Column(Text)
+    expired_at = Column(Date)
+    archived_at = Column(Date)
+
+    __table_args__ = (
+        Index('ix_events_archive_venue_key_date', 'venue_key', 'date_time'),
+    )
+
+def venue_key(venue_name):
+    # "The EARL" / "the earl " / "The Earl" -> "earl"
+    key = re.sub(r'[^a-z0-9]+', '-', (venue_name or '').lower()).strip('-')
+    return re.sub(r'^the-', '', key)
+
+# Columns a source row carries before sync adds hashes and expiry
+ROW_FIELDS = ("tm_id", "name", "date_time", "venue_name", "ticket_url", "source", "venue_key")
+
+def content_hash(row):
+    raw = "\x1f".join(str(row.get(k) or "") for k in ("name", "date_time", "venue_name", "ticket_url", "provenance"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
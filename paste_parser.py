@@ -0,0 +1,109 @@
+import re
+import dates
+import venues
+
+# Layouts the /theking paste box understands, one show per line:
+#   Band | Date | Venue             pipe- or tab-separated, fields in any order
+#   Fri, Mar 6 - Band / Band @ Venue
+#   Mar 6: Band at The EARL
+# and copied venue calendars, where a date sits on its own line and the shows
+# under it follow one per line. A default venue fills in when a line has none.
+FIELD_SPLIT = re.compile(r"\s*[|\t]\s*")
+LEADING_JUNK = re.compile(r"^(?:[-–—:|,•*]\s*|\d{1,2}(?::\d{2})?\s*(?:am|pm)\b\s*|doors\b\s*)+", re.I)
+VENUE_AT = re.compile(r"\s+@\s*|\s+at\s+", re.I)
+MAX_DATE_WORDS = 5
+MAX_LINES = 20000
+
+
+def _date_prefix(words, today):
+    # Shortest run of leading words that reads as a date ("Fri, Mar 6"), plus a
+    # trailing year if one follows ("March 6th, 2027"). Longer runs would let the
+    # range syntax swallow the lineup ("Mar 6 - Wednesday").
+    for n in range(1, min(MAX_DATE_WORDS, len(words)) + 1):
+        candidate = " ".join(words[:n]).rstrip(":-–—,")
+        try:
+            day = dates.parse_date(candidate, today)
+        except ValueError:
+            continue
+        if n < len(words) and re.fullmatch(r"\d{4},?", words[n]):
+            try:
+                return dates.parse_date(" ".join(words[:n + 1]).rstrip(","), today), n + 1
+            except ValueError:
+                pass
+        return day, n
+    return None, 0
+
+
+def _split_venue(text, default_venue):
+    # "Band @ Venue" always splits; "Band at Venue" only when Venue is one we know,
+    # so "Live at Budokan" stays a lineup
+    matches = list(VENUE_AT.finditer(text))
+    if matches:
+        last = matches[-1]
+        venue = text[last.end():].strip()
+        if "@" in last.group() or venues.canonical_key(venue) in venues.VENUES:
+            return text[:last.start()], venue
+    return text, default_venue
+
+
+def _fields_row(fields, default_venue, today):
+    day, rest = None, []
+    for field in fields:
+        if day is None:
+            try:
+                day = dates.parse_date(field, today)
+                continue
+            except ValueError:
+                pass
+        if field:
+            rest.append(field)
+    if day is None:
+        # Report the column that was meant to be the date
+        text = fields[1] if len(fields) > 1 else fields[0]
+        raise dates.DateParseError(text, "unrecognized date" if text else "missing date")
+    if not rest:
+        raise ValueError("missing name")
+    return rest[0], day, rest[1] if len(rest) > 1 else default_venue
+
+
+def parse_lines(lines, default_venue=None, today=None):
+    # Generator over any iterable of lines (a StringIO or an uploaded file), so
+    # a long paste is never split or held in memory twice. Yields one dict per
+    # show, or per line that could not be read, in input order.
+    today = today or dates.atl_today()
+    default_venue = (default_venue or "").strip() or None
+    current_day = None
+    for number, raw in enumerate(lines, 1):
+        if number > MAX_LINES:
+            yield {"line": number, "text": "", "reason": f"stopped after {MAX_LINES} lines"}
+            return
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            fields = FIELD_SPLIT.split(line)
+            if len(fields) > 1:
+                name, day, venue = _fields_row(fields, default_venue, today)
+            else:
+                day, n = _date_prefix(line.split(), today)
+                if day is not None:
+                    rest = " ".join(line.split()[n:])
+                else:
+                    day, rest = current_day, line
+                if day is None:
+                    raise ValueError("no date found")
+                rest = LEADING_JUNK.sub("", rest).strip()
+                if not rest:
+                    # A date on its own heads the shows listed under it
+                    current_day = day
+                    continue
+                name, venue = _split_venue(rest, default_venue)
+            name = name.strip(" -–—,")
+            if not name:
+                raise ValueError("missing name")
+            if not venue:
+                raise ValueError("missing venue")
+        except ValueError as e:
+            yield {"line": number, "text": line[:200], "reason": str(e)}
+            continue
+        yield {"line": number, "name": name, "date": day.isoformat(), "venue": venue.strip()}
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+import traceback
+from datetime import datetime, timezone
+from sqlalchemy import text
+import archive
+import collector
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process file lock
+    fcntl = None
+
+SYNC_ENABLED = os.getenv("SYNC_ENABLED", "1") != "0"
+SYNC_INTERVAL = int(os.getenv("SYNC_INTERVAL_MINUTES", "360")) * 60
+# Let the web server finish booting before the first sync
+SYNC_INITIAL_DELAY = int(os.getenv("SYNC_INITIAL_DELAY_SECONDS", "15"))
+SYNC_LOCK_FILE = os.getenv("SYNC_LOCK_FILE", "shows.db.sync.lock")
+ADVISORY_LOCK_KEY = 0x41544C53  # "ATLS"
+
+status = {
+    "enabled": SYNC_ENABLED,
+    "interval_seconds": SYNC_INTERVAL,
+    "running": False,
+    "runs": 0,
+    "skipped": 0,
+    "last_started": None,
+    "last_finished": None,
+    "last_duration_seconds": None,
+    "last_result": None,
+    "last_error": None,
+    "next_run": None,
+}
+
+
+class SyncLock:
+    # Only one replica syncs at a time: a Postgres advisory lock held on a
+    # dedicated connection, or an flock on a file next to the SQLite database.
+    def __init__(self, engine):
+        self.engine = engine
+        self.conn = None
+        self.fh = None
+
+    def acquire(self):
+        if self.engine.dialect.name == "postgresql":
+            # Autocommit, so the connection holding the lock isn't idle in a
+            # transaction for the whole sync (and reaped by the server)
+            self.conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            if self.conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY}).scalar():
+                return True
+            self.conn.close()
+            self.conn = None
+            return False
+        if fcntl is None:
+            return True
+        self.fh = open(SYNC_LOCK_FILE, "w")
+        try:
+            fcntl.flock(self.fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self.fh.close()
+            self.fh = None
+            return False
+
+    def release(self):
+        if self.conn is not None:
+            self.conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+            self.conn.close()
+            self.conn = None
+        if self.fh is not None:
+            fcntl.flock(self.fh, fcntl.LOCK_UN)
+            self.fh.close()
+            self.fh = None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def run_once():
+    lock = SyncLock(collector.engine)
+    if not lock.acquire():
+        status["skipped"] += 1
+        return None
+    started = time.monotonic()
+    status.update(running=True, last_started=_now())
+    try:
+        result = collector.sync()
+        # Past shows leave the hot table on the same schedule, under the same lock
+        result["archived"] = archive.archive_past(collector.engine)
+        status.update(last_result=result, last_error=None)
+        return result
+    except Exception as e:
+        status["last_error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    finally:
+        lock.release()
+        status.update(
+            running=False,
+            runs=status["runs"] + 1,
+            last_finished=_now(),
+            last_duration_seconds=round(time.monotonic() - started, 2),
+        )
+
+
+async def run_forever(interval=SYNC_INTERVAL, initial_delay=SYNC_INITIAL_DELAY):
+    await asyncio.sleep(initial_delay)
+    while True:
+        # collector.sync is blocking I/O; keep it off the event loop
+        await asyncio.to_thread(run_once)
+        status["next_run"] = datetime.fromtimestamp(time.time() + interval, timezone.utc).isoformat(timespec="seconds")
+        await asyncio.sleep(interval)
+
+
+def start():
+    if not SYNC_ENABLED:
+        return None
+    return asyncio.create_task(run_forever())
@@ -1,88 +1,108 @@
 import json
 import re
-from datetime import datetime
-from playwright.sync_api import sync_playwright
+from browser_pool import shared_pool, close_shared_pool, USER_AGENT
+from http_cache import shared_cache
+from jsonld import extract_jsonld, decode_chunks, iter_jsonld_items
+import sources
+import dates
 
-def scrape_the_earl():
+# Using the primary verified Bandsintown URL for The Earl
+EARL_URL = "https://www.bandsintown.com/v/10001781-the-earl"
+
+async def read_jsonld_scripts(page, url=EARL_URL):
+    # wait_until="commit" is the fastest way to get in before ads load
+    await page.goto(url, wait_until="commit", timeout=60000)
+
+    # Script tags are metadata, so we wait for 'attached' state
+    await page.wait_for_selector('script[type="application/ld+json"]', state="attached", timeout=15000)
+
+    # One evaluate for every block instead of a round trip per script
+    return await page.eval_on_selector_all('script[type="application/ld+json"]', "nodes => nodes.map(n => n.textContent)")
+
+def earl_events_from_jsonld(blocks, url=EARL_URL):
     events = []
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'
-        )
-        page = context.new_page()
-        
-        # Using the primary verified Bandsintown URL for The Earl
-        url = "https://www.bandsintown.com/v/10001781-the-earl"
-        
+    for content in blocks:
         try:
-            # wait_until="commit" is the fastest way to get in before ads load
-            page.goto(url, wait_until="commit", timeout=60000)
-            
-            # Script tags are metadata, so we wait for 'attached' state
-            page.wait_for_selector('script[type="application/ld+json"]', state="attached", timeout=15000)
-            
-            scripts = page.locator('script[type="application/ld+json"]').all()
-
-            for script in scripts:
-                try:
-                    content = script.evaluate("node => node.textContent").strip()
-                    if not content: continue
-                    
-                    data = json.loads(content)
-                    
-                    # Handle lists, single objects, and nested @graph structures
-                    potential_items = []
-                    if isinstance(data, list):
-                        potential_items = data
-                    elif isinstance(data, dict):
-                        potential_items = data.get('@graph', [data])
-
-                    for item in potential_items:
-                        if not isinstance(item, dict): continue
-                        
-                        # Valid concerts always have a startDate
-                        if 'startDate' in item:
-                            name = item.get('name', '')
-                            start_date_str = item.get('startDate', '')
-                            tix_url = item.get('url', url)
-                            
-                            if not name or not start_date_str:
-                                continue
-
-                            # Parse Date
-                            clean_date_str = start_date_str.split('T')[0]
-                            dt_obj = datetime.strptime(clean_date_str, "%Y-%m-%d")
-                            event_date = dt_obj.date()
-
-                            # Final Name Cleanup
-                            # Removes "@ The EARL", "at The EARL", and "The EARL presents"
-                            clean_name = re.sub(r'(\s*@\s*The\s*EARL.*|\s+at\s+The\s+EARL.*)', '', name, flags=re.I).strip()
-                            clean_name = re.sub(r'^The\s+EARL\s+presents[:\s]+', '', clean_name, flags=re.I).strip()
-
-                            if clean_name.upper() == "THE EARL" or len(clean_name) < 2:
-                                continue
-
-                            events.append({
-                                "tm_id": f"earl-{event_date}-{clean_name.lower().replace(' ', '')[:15]}",
-                                "name": clean_name,
-                                "date_time": event_date,
-                                "venue_name": "The Earl",
-                                "ticket_url": tix_url
-                            })
-                except:
-                    continue
-
-        except Exception as e:
-            print(f"Bandsintown Sync error: {e}")
-        finally:
-            browser.close()
-            
+            content = content.strip()
+            if not content: continue
+
+            data = json.loads(content)
+
+            # Handle lists, single objects, and nested @graph structures
+            for item in iter_jsonld_items(data):
+                # Valid concerts always have a startDate
+                if 'startDate' in item:
+                    name = item.get('name', '')
+                    start_date_str = item.get('startDate', '')
+                    tix_url = item.get('url', url)
+
+                    if not name or not start_date_str:
+                        continue
+
+                    # Parse Date (ISO, possibly with a time and offset)
+                    event_date = dates.parse_date(start_date_str)
+
+                    # Final Name Cleanup
+                    # Removes "@ The EARL", "at The EARL", and "The EARL presents"
+                    clean_name = re.sub(r'(\s*@\s*The\s*EARL.*|\s+at\s+The\s+EARL.*)', '', name, flags=re.I).strip()
+                    clean_name = re.sub(r'^The\s+EARL\s+presents[:\s]+', '', clean_name, flags=re.I).strip()
+
+                    if clean_name.upper() == "THE EARL" or len(clean_name) < 2:
+                        continue
+
+                    events.append({
+                        "tm_id": f"earl-{event_date}-{clean_name.lower().replace(' ', '')[:15]}",
+                        "name": clean_name,
+                        "date_time": event_date,
+                        "venue_name": "The Earl",
+                        "ticket_url": tix_url
+                    })
+        except:
+            continue
+
     # Deduplicate based on ID
     unique_events = {e['tm_id']: e for e in events}.values()
     return list(unique_events)
 
+def fetch_jsonld_static(url=EARL_URL, http=None):
+    # Plain HTTP fetch, streamed straight into the incremental JSON-LD parser;
+    # an unchanged page (fresh, or a 304) reuses the blocks extracted last time
+    http = http or shared_cache()
+    status, blocks = http.stream_parsed(url, "bandsintown", lambda chunks: extract_jsonld(decode_chunks(chunks)),
+                                        headers={"User-Agent": USER_AGENT, "Accept": "text/html"})
+    return blocks if status == 200 else []
+
+def scrape_the_earl(pool=None):
+    # Fast path: most runs find the events in the server-rendered HTML
+    try:
+        events = earl_events_from_jsonld(fetch_jsonld_static())
+        if events:
+            return events
+    except Exception as e:
+        print(f"Bandsintown fast path error: {e}")
+
+    # Borrows a context from the shared browser instead of launching Chromium per call
+    pool = pool or shared_pool()
+    try:
+        blocks = pool.run("the-earl", read_jsonld_scripts, timeout=120)
+    except Exception as e:
+        print(f"Bandsintown Sync error: {e}")
+        blocks = []
+    return earl_events_from_jsonld(blocks)
+
+@sources.register
+class EarlSource(sources.Source):
+    name = "earl"
+    timeout = 150
+
+    def fetch(self):
+        # scrape_the_earl swallows fetch errors, so an empty result may be a failure
+        events = scrape_the_earl()
+        return sources.SourceResult(events, bool(events), error=None if events else "no events found")
+
 if __name__ == "__main__":
-    for e in scrape_the_earl():
-        print(f"{e['date_time']} | {e['name']}")
\ No newline at end of file
+    try:
+        for e in scrape_the_earl():
+            print(f"{e['date_time']} | {e['name']}")
+    finally:
+        close_shared_pool()
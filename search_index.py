@@ -0,0 +1,98 @@
+import difflib
+import re
+from sqlalchemy import func, inspect, or_, text
+from models import Event
+import cache
+
+# Queries are matched token by token as prefixes ("gou wed" finds "Wednesday /
+# Gouge Away"), plus a substring match for anything three characters or longer
+TOKEN = re.compile(r"[^\W_]+")
+TYPO_CUTOFF = 0.75
+MIN_TYPO_LENGTH = 3
+
+_ready = None
+
+
+def tokens(q):
+    return [t.lower() for t in TOKEN.findall(q or "")]
+
+
+def has_index():
+    # Checked once through the sync engine, so async sessions can ask too
+    global _ready
+    if _ready is None:
+        from database import engine
+        if engine.dialect.name == "sqlite":
+            _ready = inspect(engine).has_table("events_fts")
+        elif engine.dialect.name == "postgresql":
+            _ready = "search_vector" in {c["name"] for c in inspect(engine).get_columns("events")}
+        else:
+            _ready = False
+    return _ready
+
+
+def condition(db, q):
+    # db is a Session or an AsyncSession; only its dialect matters here
+    toks = tokens(q)
+    if not has_index():
+        return func.upper(Event.name).contains(q.upper(), autoescape=True)
+    conds = []
+    if db.bind.dialect.name == "postgresql":
+        if toks:
+            conds.append(text("events.search_vector @@ to_tsquery('simple', :tsq)").bindparams(tsq=" & ".join(f"{t}:*" for t in toks)))
+        conds.append(Event.name.icontains(q, autoescape=True))
+        return or_(*conds)
+    if toks:
+        fts = " AND ".join(f'"{t}"*' for t in toks)
+        conds.append(text("events.rowid IN (SELECT rowid FROM events_fts WHERE events_fts MATCH :fts)").bindparams(fts=fts))
+    if len(q) >= 3:
+        trgm = '"' + q.replace('"', '""') + '"'
+        conds.append(text("events.rowid IN (SELECT rowid FROM events_trgm WHERE events_trgm MATCH :trgm)").bindparams(trgm=trgm))
+    if not conds:
+        return func.upper(Event.name).contains(q.upper(), autoescape=True)
+    return or_(*conds)
+
+
+def _load_vocabulary(db):
+    if db.bind.dialect.name == "postgresql":
+        rows = db.execute(text("SELECT word FROM ts_stat('SELECT search_vector FROM events')"))
+    else:
+        rows = db.execute(text("SELECT term FROM events_fts_vocab"))
+    return sorted({r[0] for r in rows})
+
+
+def vocabulary(db):
+    # Every indexed word; rebuilt only when the data version changes. No render
+    # lock: this also runs under AsyncSession.run_sync on the event loop thread.
+    version = cache.data_version()
+    vocab = cache.peek("search-vocabulary", None)
+    if vocab is None:
+        vocab = _load_vocabulary(db)
+        cache.store("search-vocabulary", None, vocab, version)
+    return vocab
+
+
+def correct(db, q):
+    # Swaps each word that matches nothing for the closest indexed word
+    # ("wendesday" -> "wednesday"); returns q unchanged if nothing is better
+    if not has_index():
+        return q
+    vocab = vocabulary(db)
+    known = set(vocab)
+    out = []
+    for t in tokens(q):
+        # Numbers are never typos ("Blink 182")
+        if t in known or len(t) < MIN_TYPO_LENGTH or any(ch.isdigit() for ch in t) or any(v.startswith(t) for v in vocab):
+            out.append(t)
+            continue
+        close = difflib.get_close_matches(t, vocab, n=1, cutoff=TYPO_CUTOFF)
+        out.append(close[0] if close else t)
+    corrected = " ".join(out)
+    return corrected if corrected != " ".join(tokens(q)) else q
+
+
+def rebuild(engine):
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite" and inspect(conn).has_table("events_fts"):
+            conn.execute(text("INSERT INTO events_fts(events_fts) VALUES ('rebuild')"))
+            conn.execute(text("INSERT INTO events_trgm(events_trgm) VALUES ('rebuild')"))
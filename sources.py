@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# What a source hands back. events are normalized dicts with the Event columns
+# (tm_id, name, date_time as a date, venue_name, ticket_url). complete=False
+# means the fetch was partial, so rows it did not return must not be expired.
+SourceResult = namedtuple("SourceResult", ["events", "complete", "digest", "error", "seconds"], defaults=[None, None, 0.0])
+
+# Comma-separated source names; unset means every registered source
+SYNC_SOURCES = os.getenv("SYNC_SOURCES")
+
+
+class Source:
+    name = None
+    timeout = 60
+
+    def fetch(self):
+        raise NotImplementedError
+
+
+REGISTRY = {}
+
+
+def register(cls):
+    REGISTRY[cls.name] = cls()
+    return cls
+
+
+def enabled_sources():
+    if not SYNC_SOURCES:
+        return list(REGISTRY.values())
+    wanted = {n.strip() for n in SYNC_SOURCES.split(",")}
+    return [s for name, s in REGISTRY.items() if name in wanted]
+
+
+def events_digest(events):
+    raw = json.dumps(sorted(events, key=lambda e: e["tm_id"]), default=str, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _run(source):
+    started = time.monotonic()
+    result = source.fetch()
+    if not isinstance(result, SourceResult):
+        result = SourceResult(list(result), True)
+    return result._replace(
+        digest=result.digest or events_digest(result.events),
+        seconds=round(time.monotonic() - started, 2),
+    )
+
+
+def collect_all(sources=None):
+    # Every source runs at once with its own deadline; one slow or broken venue
+    # only costs its own results, and the whole run is bounded by the slowest.
+    sources = enabled_sources() if sources is None else sources
+    if not sources:
+        return {}
+    results = {}
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="source")
+    try:
+        futures = {s.name: pool.submit(_run, s) for s in sources}
+        for s in sources:
+            remaining = max(0.0, s.timeout - (time.monotonic() - started))
+            try:
+                results[s.name] = futures[s.name].result(timeout=remaining)
+            except TimeoutError:
+                results[s.name] = SourceResult([], False, error=f"timed out after {s.timeout}s", seconds=s.timeout)
+            except Exception as e:
+                results[s.name] = SourceResult([], False, error=f"{type(e).__name__}: {e}", seconds=round(time.monotonic() - started, 2))
+            if results[s.name].error:
+                print(f"Source {s.name} failed: {results[s.name].error}")
+    finally:
+        # Threads can't be killed; a timed-out source finishes in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
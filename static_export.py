@@ -0,0 +1,175 @@
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+from collections import defaultdict
+from urllib.parse import quote
+from models import Event
+import dates
+import venues
+
+# Static copy of the listing for a CDN or any plain file server: index.html
+# plus one page per venue and per month. Each file is only rewritten when its
+# content hash changes, through a temp file and a rename, so a reader never
+# sees a half-written page.
+EXPORT_DIR = os.getenv("STATIC_EXPORT_DIR", "site")
+# Where the app itself lives, for the per-show .ics links; empty when the
+# bundle is served from the same host
+APP_URL = os.getenv("STATIC_APP_URL", "").rstrip("/")
+MANIFEST = "manifest.json"
+
+STYLE = """body { background-color: #fcfcfc; color: #444; font-family: -apple-system, sans-serif; margin: 0; padding: 40px 20px; }
+h1 { text-align: center; color: #222; margin-bottom: 20px; }
+h1 a { color: inherit; text-decoration: none; }
+nav { max-width: 900px; margin: 0 auto 30px; text-align: center; font-size: 0.85rem; line-height: 2; }
+nav a { color: #007aff; text-decoration: none; margin: 0 8px; white-space: nowrap; }
+table { width: 100%; max-width: 900px; margin: auto; border-collapse: collapse; background: white; border-radius: 8px; box-shadow: 0 4px 6px rgba(0,0,0,0.05); }
+th { text-align: left; padding: 18px; background-color: #f1f1f1; border-bottom: 2px solid #eee; color: #888; font-size: 0.75rem; text-transform: uppercase; }
+td { padding: 16px 18px; border-bottom: 1px solid #f0f0f0; }
+.date-cell { font-weight: 700; color: #666; white-space: nowrap; }
+.lineup-cell { font-weight: 600; color: #222; }
+.venue-cell { color: #999; font-size: 0.9rem; }
+.btn-link { color: #007aff; text-decoration: none; font-weight: bold; }
+.btn-cal { color: #bbb; text-decoration: none; font-size: 0.8rem; margin-left: 10px; }
+"""
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_atomic(path, data):
+    # Temp file in the same directory, fsynced, then renamed over the target
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9-]+", "-", text.lower()).strip("-") or "venue"
+
+
+def render_row(e):
+    # "/" stays literal: the route takes it as part of the ID, and some proxies
+    # refuse an encoded %2F in a path
+    cal_url = f"{APP_URL}/events/{quote(e.tm_id, safe='/')}.ics"
+    return (f'<tr><td class="date-cell">{e.date_time.strftime("%a, %b %d")}</td>'
+            f'<td class="lineup-cell">{html.escape(e.name or "")}</td>'
+            f'<td class="venue-cell">{html.escape(e.venue_name or "")}</td>'
+            f'<td><a href="{html.escape(e.ticket_url or "#")}" target="_blank" class="btn-link">Tickets</a>'
+            f'<a href="{cal_url}" class="btn-cal">📅 Cal</a></td></tr>\n')
+
+
+def render_page(title, events, nav, stylesheet, root):
+    # root is the relative path back to the bundle's top, so the pages work
+    # from any prefix on a CDN
+    links = " ".join(f'<a href="{root}{href}">{html.escape(label)}</a>' for href, label in nav)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html.escape(title)}</title>
+    <link rel="stylesheet" href="{root}{stylesheet}">
+</head>
+<body>
+    <h1><a href="{root}index.html">{html.escape(title)}</a></h1>
+    <nav>{links}</nav>
+    <table>
+        <thead><tr><th>Date</th><th>Lineup</th><th>Venue</th><th>Links</th></tr></thead>
+        <tbody>
+{"".join(render_row(e) for e in events)}        </tbody>
+    </table>
+</body>
+</html>
+"""
+
+
+def render_site(events):
+    # Every output file of the bundle as {relative path: bytes}
+    css = STYLE.encode("utf-8")
+    # The stylesheet's name carries its hash, so a CDN can cache it forever
+    stylesheet = f"assets/style-{content_hash(css)[:12]}.css"
+    files = {stylesheet: css}
+
+    by_venue, by_month, venue_names = defaultdict(list), defaultdict(list), {}
+    for e in events:
+        key = _slug(e.venue_key or e.venue_name or "")
+        by_venue[key].append(e)
+        venue_names.setdefault(key, venues.display_name(e.venue_key, e.venue_name))
+        by_month[e.date_time.strftime("%Y-%m")].append(e)
+
+    nav = [(f"months/{month}.html", by_month[month][0].date_time.strftime("%b %Y")) for month in sorted(by_month)]
+    nav += [(f"venues/{key}.html", venue_names[key]) for key in sorted(venue_names, key=lambda k: venue_names[k].lower())]
+
+    files["index.html"] = render_page("ATL Show Finder", events, nav, stylesheet, "")
+    for key, rows in by_venue.items():
+        files[f"venues/{key}.html"] = render_page(f"ATL Shows at {venue_names[key]}", rows, nav, stylesheet, "../")
+    for month, rows in by_month.items():
+        files[f"months/{month}.html"] = render_page(f"ATL Shows, {rows[0].date_time:%B %Y}", rows, nav, stylesheet, "../")
+    return {path: data if isinstance(data, bytes) else data.encode("utf-8") for path, data in files.items()}
+
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        # A corrupt manifest only costs one full rewrite
+        print(f"Ignoring unreadable {MANIFEST} in {out_dir}")
+        return {}
+
+
+def export_site(db, out_dir=None, today=None):
+    # Renders the whole bundle in memory, then touches only what changed: new or
+    # edited pages are written, pages for venues and months with no upcoming
+    # shows left are removed, and the manifest of hashes is replaced last
+    out_dir = out_dir or EXPORT_DIR
+    today = today or dates.atl_today()
+    events = (db.query(Event.tm_id, Event.name, Event.date_time, Event.venue_name, Event.venue_key, Event.ticket_url)
+              .filter(Event.date_time >= today, Event.expired_at.is_(None))
+              .order_by(Event.date_time, Event.tm_id).all())
+    files = render_site(events)
+    old = _load_manifest(out_dir)
+    new = {path: content_hash(data) for path, data in files.items()}
+
+    written = 0
+    for path, data in files.items():
+        target = os.path.join(out_dir, path)
+        if old.get(path) == new[path] and os.path.exists(target):
+            continue
+        write_atomic(target, data)
+        written += 1
+    removed = 0
+    for path in set(old) - set(new):
+        target = os.path.join(out_dir, path)
+        if os.path.exists(target):
+            os.unlink(target)
+            removed += 1
+    if written or removed or old != new:
+        write_atomic(os.path.join(out_dir, MANIFEST), json.dumps({"files": new}, indent=1, sort_keys=True).encode("utf-8"))
+    return {"files": len(files), "written": written, "removed": removed}
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(export_site(db))
+    finally:
+        db.close()
@@ -1,5 +1,25 @@
-import requests
 from bs4 import BeautifulSoup
+from http_cache import shared_cache
+
+def parse_freshtix_links(body):
+    soup = BeautifulSoup(body, 'html.parser')
+    found = []
+    # Look for all links that have 'events' in the URL
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        # Filter for event links and ignore the 'Find Tickets' buttons
+        if '/events/' in href and "Find Tickets" not in link.text:
+            title = link.text.strip()
+            if not title: continue
+
+            # To find the date, we look at the text inside the same parent container
+            parent = link.find_parent('div')
+            full_text = parent.get_text(separator='|').strip() if parent else ""
+
+            # Fix the URL if it's relative
+            full_url = href if href.startswith('http') else f"https://www.freshtix.com{href}"
+            found.append({"title": title, "text": full_text, "url": full_url})
+    return found
 
 def test_boggs_v4():
     url = "https://www.freshtix.com/organizations/arippinproduction"
@@ -8,34 +28,23 @@ def test_boggs_v4():
     headers = {'User-Agent': 'Mozilla/5.0'}
 
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Look for all links that have 'events' in the URL
-        links = soup.find_all('a', href=True)
-        
-        found_count = 0
+        # Conditional GET through the shared cache; an unchanged page reuses its last parse
+        http = shared_cache()
+        response = http.fetch(url, "freshtix", headers=headers, timeout=15)
+        if response.status != 200:
+            print(f"[X] HTTP {response.status}")
+            return
+        if not response.changed:
+            print("[*] Page unchanged since last run.")
+        links = http.parsed(response, parse_freshtix_links)
+
         for link in links:
-            href = link['href']
-            # Filter for event links and ignore the 'Find Tickets' buttons
-            if '/events/' in href and "Find Tickets" not in link.text:
-                title = link.text.strip()
-                if not title: continue
-                
-                # To find the date, we look at the text inside the same parent container
-                parent = link.find_parent('div')
-                full_text = parent.get_text(separator='|').strip() if parent else ""
-                
-                # Fix the URL if it's relative
-                full_url = href if href.startswith('http') else f"https://www.freshtix.com{href}"
-                
-                print(f"TITLE: {title}")
-                print(f"EXTRACTED DATA: {full_text[:100]}...") # Show a snippet of the date info
-                print(f"URL: {full_url}")
-                print("-" * 30)
-                found_count += 1
-                
-        if found_count == 0:
+            print(f"TITLE: {link['title']}")
+            print(f"EXTRACTED DATA: {link['text'][:100]}...") # Show a snippet of the date info
+            print(f"URL: {link['url']}")
+            print("-" * 30)
+
+        if not links:
             print("[!] Still empty. Freshtix might be blocking the script or using Javascript to load the list.")
 
     except Exception as e:
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# The app reads its configuration at import: point it at a throwaway SQLite
+# file and keep the background sync off before any test imports main
+_tmp = tempfile.mkdtemp(prefix="atlshows-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'shows.db')}"
+os.environ.pop("DATABASE_PUBLIC_URL", None)
+os.environ["SYNC_ENABLED"] = "0"
+os.environ["SYNC_LOCK_FILE"] = os.path.join(_tmp, "sync.lock")
+os.environ["HTTP_CACHE_DIR"] = os.path.join(_tmp, "http_cache")
+os.environ["STATIC_EXPORT_DIR"] = os.path.join(_tmp, "site")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import asyncio
+import concurrent.futures
+import time
+import pytest
+import browser_pool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        self.browser.closed += 1
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = 0
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, user_agent=None):
+        return FakeContext(self)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    async def launch(self):
+        self._browser = FakeBrowser()
+        self._contexts = asyncio.Semaphore(self.max_contexts)
+
+    monkeypatch.setattr(browser_pool.BrowserPool, "_launch", launch)
+    pool = browser_pool.BrowserPool(max_contexts=2, per_venue=1)
+    yield pool
+    pool.close()
+
+
+def test_timeout_cancels_the_scrape_and_frees_its_slot(pool):
+    async def hang(page):
+        await asyncio.sleep(60)
+
+    async def ok(page):
+        return "done"
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        pool.run("earl", hang, timeout=0.1)
+    # The cancelled scrape closed its context and gave back the venue's only slot
+    deadline = time.monotonic() + 2
+    while pool._browser.closed < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool._browser.closed == 1
+    assert pool.run("earl", ok, timeout=1) == "done"
@@ -0,0 +1,32 @@
+from datetime import timedelta
+from urllib.parse import quote
+import pytest
+from fastapi.testclient import TestClient
+import dates
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+def test_event_ics_with_slash_in_id(client):
+    # Manual IDs keep the lineup's "/", which the client sends as %2F
+    day = dates.atl_today() + timedelta(days=30)
+    saved = client.post("/theking/bulk-save", json=[{"name": "Wednesday / Gouge Away", "date": day.isoformat(), "venue": "The EARL"}])
+    assert saved.status_code == 200
+    tm_id = f"manual-Wednesday/GougeAway-{day.isoformat()}"
+
+    for path in (quote(tm_id, safe=""), quote(tm_id, safe="/")):
+        r = client.get(f"/events/{path}.ics")
+        assert r.status_code == 200, path
+        assert r.headers["content-type"].startswith("text/calendar")
+        assert f"UID:{tm_id}@" in r.text
+        assert "SUMMARY:Wednesday / Gouge Away" in r.text
+
+
+def test_event_ics_unknown_and_non_ics(client):
+    assert client.get("/events/nope.ics").status_code == 404
+    assert client.get("/events/manual-A/B").status_code == 404
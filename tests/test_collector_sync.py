@@ -0,0 +1,92 @@
+from datetime import timedelta
+import pytest
+import collector
+import dates
+import sources
+from database import engine, SessionLocal, read_version
+from models import Event
+
+
+@pytest.fixture
+def run_sync(monkeypatch):
+    # Runs collector.sync against scripted source results instead of the network
+    monkeypatch.setattr(collector, "_last_sync", {"digest": None, "rows": 0})
+
+    def run(results):
+        monkeypatch.setattr(sources, "collect_all", lambda: {
+            name: sources.SourceResult(events, complete, digest=str(hash((tuple(e["tm_id"] + e["name"] for e in events), complete))))
+            for name, (events, complete) in results.items()})
+        return collector.sync()
+    return run
+
+
+def _show(tm_id, name, day, venue="The EARL"):
+    return {"tm_id": tm_id, "name": name, "date_time": day, "venue_name": venue, "ticket_url": f"https://example.com/{tm_id}"}
+
+
+def _stored(tm_id):
+    db = SessionLocal()
+    try:
+        return db.get(Event, tm_id)
+    finally:
+        db.close()
+
+
+def _version():
+    with engine.connect() as conn:
+        return read_version(conn)[0]
+
+
+def test_unchanged_payload_writes_nothing(run_sync):
+    day = dates.atl_today() + timedelta(days=70)
+    payload = {"feed_same": ([_show("same-1", "Steady Band", day), _show("same-2", "Other Steady Band", day, "Terminal West")], True)}
+    first = run_sync(payload)
+    assert first["inserted"] == 2
+    version = _version()
+
+    again = run_sync(payload)
+    assert again["skipped"] is True
+    assert _version() == version
+
+    # A fresh process has no fingerprint, so it diffs, and still finds nothing to write
+    collector._last_sync.update(digest=None)
+    diffed = run_sync(payload)
+    assert "skipped" not in diffed
+    assert (diffed["inserted"], diffed["updated"], diffed["expired"]) == (0, 0, 0)
+    # Stored manual shows take part in every sync, so count relative to the first run
+    assert diffed["unchanged"] == first["unchanged"] + 2
+    assert _version() == version
+
+
+def test_partial_source_failure_expires_nothing(run_sync):
+    day = dates.atl_today() + timedelta(days=71)
+    run_sync({"feed_partial": ([_show("part-1", "First Band", day), _show("part-2", "Second Band", day, "Terminal West")], True)})
+
+    result = run_sync({"feed_partial": ([_show("part-1", "First Band", day)], False)})
+    assert result["expired"] == 0
+    assert _stored("part-2").expired_at is None
+
+
+def test_complete_source_expires_missing_rows(run_sync):
+    day = dates.atl_today() + timedelta(days=72)
+    run_sync({"feed_complete": ([_show("full-1", "Staying Band", day), _show("full-2", "Cancelled Band", day, "Terminal West")], True)})
+
+    result = run_sync({"feed_complete": ([_show("full-1", "Staying Band", day)], True)})
+    assert result["expired"] == 1
+    assert _stored("full-2").expired_at == dates.atl_today()
+    assert _stored("full-1").expired_at is None
+
+
+def test_absorbed_duplicate_is_expired(run_sync):
+    day = dates.atl_today() + timedelta(days=73)
+    run_sync({"feed_dup_b": ([_show("dup-b", "Pile / Big Ups", day)], True)})
+    assert _stored("dup-b").expired_at is None
+
+    # The same show now also arrives from a feed whose record wins the merge
+    result = run_sync({"feed_dup_a": ([_show("dup-a", "Pile", day)], True),
+                       "feed_dup_b": ([_show("dup-b", "Pile / Big Ups", day)], True)})
+    assert result["merged"] == 1
+    assert _stored("dup-b").expired_at == dates.atl_today()
+    winner = _stored("dup-a")
+    assert winner.expired_at is None
+    assert winner.name == "Pile / Big Ups"
@@ -0,0 +1,31 @@
+from datetime import timedelta
+from fastapi.testclient import TestClient
+import cache
+import dates
+import main
+from database import SessionLocal, bump_version, upsert_events
+
+
+def test_write_from_another_replica_invalidates_cached_renders(monkeypatch):
+    monkeypatch.setattr(cache, "VERSION_POLL_SECONDS", 0)
+    with TestClient(main.app) as client:
+        before = client.get("/events")
+        etag = before.headers["etag"]
+        assert client.get("/events", headers={"If-None-Match": etag}).status_code == 304
+
+        # Another process writes straight to the database; this one's cache is
+        # only told through the shared version row
+        day = dates.atl_today() + timedelta(days=1)
+        db = SessionLocal()
+        try:
+            upsert_events(db, [{"tm_id": "replica-b-1", "name": "Other Replica Band", "date_time": day, "venue_name": "The EARL",
+                                "ticket_url": None, "source": "manual", "venue_key": "earl"}])
+            bump_version(db)
+            db.commit()
+        finally:
+            db.close()
+
+        after = client.get("/events", headers={"If-None-Match": etag})
+        assert after.status_code == 200
+        assert any(e["name"] == "Other Replica Band" for e in after.json())
+        assert "Other Replica Band" in client.get("/").text
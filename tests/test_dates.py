@@ -0,0 +1,43 @@
+from datetime import date
+import pytest
+import dates
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2027-03-06", date(2027, 3, 6)),
+    ("2027-03-06T20:00:00-05:00", date(2027, 3, 6)),
+    ("3/6/27", date(2027, 3, 6)),
+    ("03-06-2027", date(2027, 3, 6)),
+    ("Mar 6", date(2027, 3, 6)),
+    ("Fri, March 6th 2027", date(2027, 3, 6)),
+    ("6 March 2027", date(2027, 3, 6)),
+    ("Fri 3.6", date(2027, 3, 6)),
+    ("Oct 20 @ 8pm", date(2026, 10, 20)),
+    ("Oct 10", date(2026, 10, 10)),
+    ("Sep 1", date(2027, 9, 1)),
+])
+def test_parses_single_dates(text, expected):
+    assert dates.parse_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Mar 6-8", "Mar 6 - 8", "Mar 6 to Mar 8", "Mar 6 thru Apr 2", "Fri Mar 6 - Sun Mar 8",
+    "6 March - 8 March", "3/6-3/8", "3/6 - 3/8", "3/6/27 - 3/8/27", "Mar 6, 2027 - Mar 8, 2027",
+])
+def test_range_is_listed_on_its_first_night(text):
+    assert dates.parse_date(text, TODAY).replace(year=2027) == date(2027, 3, 6)
+
+
+@pytest.mark.parametrize("text", ["Mar 6 - whatever", "3/6 today", "3/6 tomorrow night", "Mar 6 to be announced", "3/6 - tba"])
+def test_range_end_must_be_a_date(text):
+    with pytest.raises(dates.DateParseError):
+        dates.parse_date(text, TODAY)
+
+
+def test_reports_missing_and_impossible_dates():
+    with pytest.raises(dates.DateParseError, match="missing date"):
+        dates.parse_date("  ", TODAY)
+    with pytest.raises(dates.DateParseError, match="no such date"):
+        dates.parse_date("2/30/2027", TODAY)
@@ -0,0 +1,83 @@
+import json
+from datetime import timedelta
+import pytest
+import dates
+import dedup
+import migrations
+from database import engine, SessionLocal, upsert_events
+from models import Event, content_hash
+
+
+@pytest.fixture
+def db():
+    migrations.migrate(engine)
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+
+
+def _row(tm_id, name, day, source, **extra):
+    row = {"tm_id": tm_id, "name": name, "date_time": day, "venue_name": "The EARL",
+           "ticket_url": f"https://example.com/{tm_id}", "source": source, "venue_key": "earl"}
+    row.update(extra)
+    return row
+
+
+def test_paste_leaves_unmatched_shows_alone(db):
+    today = dates.atl_today()
+    day = today + timedelta(days=50)
+    provenance = json.dumps([{"source": "ticketmaster", "tm_id": "TM1"}, {"source": "earl", "tm_id": "earl-x"}])
+    winner = _row("TM1", "Pile / Big Ups", day, "ticketmaster", provenance=provenance, expired_at=None)
+    winner["content_hash"] = content_hash(winner)
+    folded = _row("earl-x", "Pile", day, "earl", provenance=None, expired_at=today)
+    folded["content_hash"] = content_hash(folded)
+    upsert_events(db, [winner, folded])
+
+    result = dedup.write_with_dedup(db, [_row(f"manual-OtherAct-{day}", "Other Act", day, "manual")], today)
+    assert result == {"inserted": 1, "updated": 0, "merged": 0}
+    stored = db.get(Event, "TM1")
+    assert stored.provenance == provenance
+    assert stored.content_hash == winner["content_hash"]
+
+
+def test_paste_matching_a_merged_show_keeps_its_provenance(db):
+    today = dates.atl_today()
+    day = today + timedelta(days=51)
+    provenance = json.dumps([{"source": "ticketmaster", "tm_id": "TM2"}, {"source": "earl", "tm_id": "earl-y"}])
+    winner = _row("TM2", "Wednesday / Gouge Away", day, "ticketmaster", provenance=provenance, expired_at=None)
+    winner["content_hash"] = content_hash(winner)
+    upsert_events(db, [winner])
+
+    pasted = _row(f"manual-Wednesday-{day}", "Wednesday / Truth Club", day, "manual")
+    result = dedup.write_with_dedup(db, [pasted], today)
+    assert result["merged"] == 1
+    stored = db.get(Event, "TM2")
+    assert stored.name == "Wednesday / Gouge Away / Truth Club"
+    assert [x["tm_id"] for x in json.loads(stored.provenance)] == ["TM2", pasted["tm_id"], "earl-y"]
+
+
+def test_early_and_late_shows_stay_separate():
+    day = dates.atl_today() + timedelta(days=52)
+    early = _row("manual-a", "Bazooka Tooth (3pm)", day, "manual", venue_key="culture-shock")
+    late = _row("manual-b", "Bazooka Tooth (7pm)", day, "manual", venue_key="culture-shock")
+    merged, absorbed = dedup.resolve([early, late])
+    assert absorbed == set()
+    assert len(merged) == 2
+
+
+def test_untimed_listing_folds_into_the_nights_only_show():
+    day = dates.atl_today() + timedelta(days=53)
+    tm = _row("TM3", "Bazooka Tooth", day, "ticketmaster")
+    pasted = _row("manual-c", "Bazooka Tooth (7pm)", day, "manual")
+    merged, absorbed = dedup.resolve([tm, pasted])
+    assert absorbed == {"manual-c"}
+
+
+def test_one_word_act_is_not_the_headliner_of_a_longer_name():
+    day = dates.atl_today() + timedelta(days=54)
+    earth = _row("earl-1", "Earth", day, "earl")
+    ewf = _row("TM4", "Earth, Wind & Fire", day, "ticketmaster")
+    merged, absorbed = dedup.resolve([earth, ewf])
+    assert absorbed == set()
+    assert dedup.similarity("Wednesday, Gouge Away", "Wednesday / Truth Club") == 1.0
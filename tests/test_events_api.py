@@ -0,0 +1,98 @@
+from datetime import timedelta
+import pytest
+from fastapi.testclient import TestClient
+import dates
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        day = dates.atl_today() + timedelta(days=60)
+        shows = [{"name": f"Paging Band {i}", "date": (day + timedelta(days=i % 20)).isoformat(), "venue": "The Masquerade"} for i in range(150)]
+        assert c.post("/theking/bulk-save", json=shows).status_code == 200
+        yield c
+
+
+def test_events_without_paging_returns_everything(client):
+    r = client.get("/events")
+    assert r.status_code == 200
+    assert "x-next-cursor" not in r.headers
+    assert sum(1 for e in r.json() if e["name"].startswith("Paging Band")) == 150
+
+
+def test_events_follows_cursor_when_paged(client):
+    seen, url = [], "/events?limit=40"
+    while url:
+        r = client.get(url)
+        assert r.status_code == 200
+        seen += [e["id"] for e in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        url = f"/events?limit=40&after={cursor}" if cursor else None
+    assert len(seen) == len(set(seen)) == len(client.get("/events").json())
+
+
+def test_bare_events_revalidates_with_304(client):
+    first = client.get("/events")
+    etag = first.headers["etag"]
+    assert first.headers.get("last-modified")
+    again = client.get("/events", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    # A write invalidates it
+    day = dates.atl_today() + timedelta(days=90)
+    client.post("/theking/bulk-save", json=[{"name": "Late Addition", "date": day.isoformat(), "venue": "The EARL"}])
+    changed = client.get("/events", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert any(e["name"] == "Late Addition" for e in changed.json())
+
+
+def test_admin_venue_filter_groups_spellings(client):
+    day = dates.atl_today() + timedelta(days=100)
+    client.post("/theking/bulk-save", json=[
+        {"name": "Spelling One", "date": day.isoformat(), "venue": "The Earl"},
+        {"name": "Spelling Two", "date": day.isoformat(), "venue": "the EARL"},
+    ])
+    first = client.get("/theking/shows").json()
+    earl = [v for v in first["venues"] if v["key"] == "earl"]
+    assert len(earl) == 1 and len([v for v in first["venues"] if v["name"].lower().endswith("earl")]) == 1
+    names = {r["name"] for r in client.get("/theking/shows", params={"venue": "earl", "limit": 500}).json()["rows"]}
+    assert {"Spelling One", "Spelling Two"} <= names
+    assert names == {r["name"] for r in client.get("/theking/shows", params={"venue": "The Earl", "limit": 500}).json()["rows"]}
+
+
+def test_search_rows_escape_pasted_markup(client):
+    day = dates.atl_today() + timedelta(days=90)
+    show = {"name": "<img src=x onerror=alert(1)> Trio", "date": day.isoformat(), "venue": "The EARL"}
+    assert client.post("/theking/bulk-save", json=[show]).status_code == 200
+    r = client.get("/search", params={"q": "trio"})
+    assert r.status_code == 200
+    assert "<img" not in r.text
+    assert "&lt;img src=x onerror=alert(1)&gt; Trio" in r.text
+
+
+def test_render_row_drops_non_http_ticket_links():
+    from types import SimpleNamespace
+    day = dates.atl_today()
+    row = SimpleNamespace(tm_id="x'); alert(1); ('", name="A", venue_name="B", date_time=day, ticket_url="javascript:alert(1)")
+    html = main.render_row(row)
+    assert 'href="#"' in html
+    assert "javascript:" not in html
+    assert "alert(1); ('" not in html
+    ok = main.render_row(SimpleNamespace(**dict(vars(row), ticket_url="https://tickets.example/?a=1&b=2")))
+    assert 'href="https://tickets.example/?a=1&amp;b=2"' in ok
+
+
+def test_events_clamps_a_past_start_to_today(client):
+    from database import SessionLocal, upsert_events
+    past = dates.atl_today() - timedelta(days=2)
+    db = SessionLocal()
+    try:
+        upsert_events(db, [{"tm_id": "past-not-archived", "name": "Last Week Band", "date_time": past, "venue_name": "The EARL",
+                            "ticket_url": None, "source": "manual", "venue_key": "earl"}])
+        db.commit()
+    finally:
+        db.close()
+    r = client.get("/events", params={"start": "2020-01-01"})
+    assert r.status_code == 200
+    assert "past-not-archived" not in {e["id"] for e in r.json()}
+    assert all(e["date_time"] >= dates.atl_today().isoformat() for e in r.json())
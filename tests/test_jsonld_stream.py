@@ -0,0 +1,41 @@
+import json
+from http_cache import HTTPCache
+from jsonld import decode_chunks, extract_jsonld
+from stub_server import StubServer
+
+EVENT = {"@type": "MusicEvent", "name": "Sólo Ñandú", "startDate": "2026-12-09"}
+PAGE = ("<html><head><title>x</title></head><body>" + "<p>filler</p>" * 500 +
+        f'<script type="application/ld+json">{json.dumps([EVENT], ensure_ascii=False)}</script></body></html>').encode("utf-8")
+
+
+def _handler(request):
+    if request.headers.get("If-None-Match") == '"v1"':
+        return 304, {"ETag": '"v1"'}, b""
+    return 200, {"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"}, PAGE
+
+
+def test_stream_parsed_feeds_parser_chunk_by_chunk_and_revalidates(tmp_path):
+    seen = []
+
+    def parse(chunks):
+        def counted():
+            for chunk in chunks:
+                seen.append(len(chunk))
+                yield chunk
+        return extract_jsonld(decode_chunks(counted()))
+
+    # TTL 0: every call goes upstream, conditionally once a parse is stored
+    http = HTTPCache(str(tmp_path), ttls={"default": 0})
+    with StubServer(_handler) as stub:
+        # Small chunks split the multi-byte characters across reads
+        status, blocks = http.stream_parsed(stub.url + "/earl", parse=parse, chunk_size=7)
+        assert status == 200
+        assert json.loads(blocks[0]) == [EVENT]
+        assert len(seen) > 100 and max(seen) <= 7
+
+        seen.clear()
+        status, again = http.stream_parsed(stub.url + "/earl", parse=parse, chunk_size=7)
+        assert status == 200 and again == blocks
+        assert stub.requests[-1].headers.get("If-None-Match") == '"v1"'
+        # A 304 reuses the stored parse without reading a body
+        assert seen == []
@@ -0,0 +1,35 @@
+import json
+import os
+import re
+from datetime import timedelta
+from fastapi.testclient import TestClient
+import dates
+import main
+import static_export
+from database import SessionLocal
+
+
+def test_export_links_and_incremental_writes(tmp_path):
+    day = dates.atl_today() + timedelta(days=40)
+    with TestClient(main.app) as client:
+        client.post("/theking/bulk-save", json=[{"name": "Pile / Big Ups", "date": day.isoformat(), "venue": "The EARL"}])
+        db = SessionLocal()
+        try:
+            first = static_export.export_site(db, str(tmp_path))
+            again = static_export.export_site(db, str(tmp_path))
+        finally:
+            db.close()
+        assert first["written"] == first["files"]
+        assert again["written"] == 0 and again["removed"] == 0
+
+        page = (tmp_path / "index.html").read_text(encoding="utf-8")
+        links = re.findall(r'href="(/events/[^"]+\.ics)"', page)
+        slashed = [l for l in links if "Pile/BigUps" in l]
+        assert slashed
+        # Every calendar link in the bundle resolves against the app
+        for link in slashed:
+            assert client.get(link).status_code == 200
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())["files"]
+    assert "index.html" in manifest and any(p.startswith("venues/") for p in manifest)
+    assert not [f for f in os.listdir(tmp_path) if f.startswith(".tmp-")]
@@ -0,0 +1,114 @@
+import json
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+import pytest
+import tm_client
+from http_cache import HTTPCache
+from stub_server import StubServer
+
+
+def _page(page, total_pages, state="GA", extra=()):
+    events = [{"id": f"E{page}-{i}", "name": f"Band {page}-{i}", "url": f"https://tm.example/{page}/{i}",
+               "dates": {"start": {"localDate": "2026-12-09"}},
+               "_embedded": {"venues": [{"name": "The Tabernacle", "state": {"stateCode": state}}]}}
+              for i in range(3)] + list(extra)
+    return json.dumps({"_embedded": {"events": events}, "page": {"number": page, "totalPages": total_pages}}).encode()
+
+
+class Discovery:
+    # Stub of the Discovery API's /events.json: pages with ETags, plus scripted
+    # failures per page number
+    def __init__(self, total_pages, failures=None, extra=()):
+        self.total_pages = total_pages
+        self.extra = extra
+        self.failures = {p: list(statuses) for p, statuses in (failures or {}).items()}
+        self.pages = Counter()
+
+    def __call__(self, request):
+        url = urlparse(request.path)
+        assert url.path == "/events.json"
+        page = int(parse_qs(url.query)["page"][0])
+        self.pages[page] += 1
+        if self.failures.get(page):
+            status = self.failures[page].pop(0)
+            return status, {"Retry-After": "0"} if status == 429 else {}, b"{}"
+        etag = f'"p{page}"'
+        if request.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "application/json"}, _page(page, self.total_pages, extra=self.extra)
+
+
+def _fetcher(stub, tmp_path, **kwargs):
+    http = HTTPCache(str(tmp_path), ttls={"default": 0})
+    return tm_client.TMFetcher("test-key", base_url=stub.url, rate=1000, backoff=0, http=http, **kwargs)
+
+
+def test_pages_through_every_result(tmp_path):
+    api = Discovery(total_pages=3)
+    with StubServer(api) as stub:
+        result = _fetcher(stub, tmp_path).fetch_all()
+    assert result.complete and result.changed
+    assert len(result.events) == 9
+    assert set(api.pages) == {0, 1, 2}
+    assert stub.requests[0].path.count("apikey=test-key") == 1
+
+
+def test_retries_503_and_429_then_succeeds(tmp_path):
+    api = Discovery(total_pages=2, failures={1: [503, 429]})
+    with StubServer(api) as stub:
+        result = _fetcher(stub, tmp_path).fetch_all()
+    assert result.complete
+    assert len(result.events) == 6
+    assert api.pages[1] == 3
+
+
+def test_gives_up_after_max_retries_and_marks_incomplete(tmp_path):
+    api = Discovery(total_pages=2, failures={1: [503] * 10})
+    with StubServer(api) as stub:
+        result = _fetcher(stub, tmp_path, max_retries=2).fetch_all()
+    assert not result.complete
+    assert len(result.events) == 3
+    assert api.pages[1] == 3
+
+
+def test_non_retryable_status_raises(tmp_path):
+    api = Discovery(total_pages=1, failures={0: [401]})
+    with StubServer(api) as stub:
+        with pytest.raises(tm_client.TMFetchError):
+            _fetcher(stub, tmp_path).get_page(0)
+    assert api.pages[0] == 1
+
+
+def test_stops_at_the_deep_paging_cap(tmp_path):
+    api = Discovery(total_pages=15)
+    with StubServer(api) as stub:
+        result = _fetcher(stub, tmp_path).fetch_all()
+    assert not result.complete
+    assert max(api.pages) == tm_client.MAX_RESULTS // tm_client.PAGE_SIZE - 1
+    assert len(result.events) == 30
+
+
+def test_unchanged_pages_revalidate_with_304(tmp_path):
+    api = Discovery(total_pages=2)
+    with StubServer(api) as stub:
+        fetcher = _fetcher(stub, tmp_path)
+        first = fetcher.fetch_all()
+        second = fetcher.fetch_all()
+    assert second.events == first.events
+    assert second.digest == first.digest
+    assert not second.changed
+    assert all(r.headers.get("If-None-Match") for r in stub.requests[-2:])
+
+
+def test_malformed_events_are_skipped_not_fatal(tmp_path, capsys):
+    tba = {"id": "TBA", "name": "Date TBA", "url": "https://tm.example/tba", "dates": {"start": {"dateTBA": True}},
+           "_embedded": {"venues": [{"name": "The Tabernacle", "state": {"stateCode": "GA"}}]}}
+    no_venue = {"id": "NOVENUE", "name": "Somewhere", "url": "https://tm.example/nv", "dates": {"start": {"localDate": "2026-12-09"}}}
+    empty_venues = dict(no_venue, id="EMPTY", _embedded={"venues": []})
+    api = Discovery(total_pages=2, extra=[tba, no_venue, empty_venues])
+    with StubServer(api) as stub:
+        result = _fetcher(stub, tmp_path).fetch_all()
+    assert result.complete
+    assert len(result.events) == 6
+    assert not {"TBA", "NOVENUE", "EMPTY"} & {e["id"] for e in result.events}
+    assert "skipped 3 malformed events" in capsys.readouterr().out
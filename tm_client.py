@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from http_cache import shared_cache
+
+# Point TM_BASE_URL at a local stub server to exercise the fetcher offline
+TM_BASE_URL = os.getenv("TM_BASE_URL", "https://app.ticketmaster.com/discovery/v2")
+
+# Discovery API quota is 5 requests/second (and 5000/day) per key
+TM_RATE_PER_SEC = float(os.getenv("TM_RATE_PER_SEC", "5"))
+PAGE_SIZE = 100
+# The Discovery API rejects deep paging past page * size >= 1000
+MAX_RESULTS = 1000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+SEARCH_PARAMS = {
+    "geoPoint": "33.7490,-84.3880",
+    "radius": "30",
+    "unit": "miles",
+    "classificationId": "KZFzniwnSyZfZ7v7nJ,KnvZfZ7v7n1",
+    "size": str(PAGE_SIZE),
+    "sort": "date,asc",
+}
+
+# digest identifies the exact set of pages fetched; changed is False when every
+# page matched its cached copy
+FetchResult = namedtuple("FetchResult", ["events", "complete", "changed", "digest"], defaults=[True, None])
+
+
+class TMFetchError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class TMFetcher:
+    def __init__(self, api_key, base_url=TM_BASE_URL, rate=TM_RATE_PER_SEC, workers=4,
+                 max_retries=4, backoff=0.5, timeout=(5, 20), http=None):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/events.json"
+        self.bucket = TokenBucket(rate)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.http = http or shared_cache()
+
+    def get_page(self, page):
+        params = dict(SEARCH_PARAMS, apikey=self.api_key, page=str(page))
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                r = self.http.fetch(self.url, "ticketmaster", params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error, retry_after = e, None
+            else:
+                if r.status == 200:
+                    return r
+                if r.status not in RETRY_STATUSES:
+                    raise TMFetchError(f"page {page}: HTTP {r.status}")
+                error, retry_after = f"HTTP {r.status}", r.headers.get("Retry-After")
+            if attempt == self.max_retries:
+                raise TMFetchError(f"page {page}: {error}")
+            # Exponential backoff with full jitter, unless the API told us how long to wait
+            delay = self.backoff * (2 ** attempt) * random.random()
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            time.sleep(delay)
+
+    def fetch_all(self):
+        first = self.get_page(0)
+        total_pages = json.loads(first.body).get("page", {}).get("totalPages", 1)
+        last_page = min(total_pages, MAX_RESULTS // PAGE_SIZE)
+        pages, complete = [first], True
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.get_page, p) for p in range(1, last_page)]
+            for f in futures:
+                try:
+                    pages.append(f.result())
+                except TMFetchError as e:
+                    print(f"Ticketmaster fetch error: {e}")
+                    complete = False
+        if total_pages > last_page:
+            complete = False
+
+        res, seen = [], set()
+        for page in pages:
+            # Unchanged pages reuse their stored parse
+            for e in self.http.parsed(page, parse_page):
+                if e['id'] not in seen:
+                    res.append(e)
+                    seen.add(e['id'])
+        digest = hashlib.sha256("".join(p.content_hash or "" for p in pages).encode()).hexdigest()
+        return FetchResult(res, complete, any(p.changed for p in pages), digest)
+
+
+def parse_page(body):
+    # A malformed event (TBA date, no venue) is skipped on its own; it must not
+    # cost the rest of the page or the whole source
+    res, skipped = [], 0
+    for e in json.loads(body).get('_embedded', {}).get('events', []):
+        try:
+            v_info = e['_embedded']['venues'][0]
+            if v_info.get('state', {}).get('stateCode') == 'GA':
+                res.append({"id": e['id'], "name": e['name'], "date": e['dates']['start']['localDate'], "venue": v_info['name'], "url": e['url']})
+        except (KeyError, IndexError, TypeError):
+            skipped += 1
+    if skipped:
+        print(f"Ticketmaster: skipped {skipped} malformed events")
+    return res
@@ -0,0 +1,58 @@
+import difflib
+import re
+from functools import lru_cache
+from models import venue_key
+
+# Canonical venue ID -> display name, exact aliases, and substrings that mark a
+# room inside a multi-room venue. Anything not listed keys on its own slug.
+VENUES = {
+    "masquerade": {"name": "The Masquerade", "contains": ["masquerade"]},
+    "center-stage": {"name": "Center Stage / Loft / Vinyl", "contains": ["center stage", "the loft", "vinyl"]},
+    "earl": {"name": "The EARL", "aliases": ["The Earl", "EARL", "The EARL Atlanta"]},
+    "529": {"name": "529", "aliases": ["529 Atlanta", "529 East Atlanta"]},
+    "boggs": {"name": "Boggs Social & Supply", "aliases": ["Boggs", "Boggs Social", "Boggs Social and Supply"]},
+    "culture-shock": {"name": "Culture Shock", "aliases": ["Culture Shock ATL"]},
+    "eastern": {"name": "The Eastern", "aliases": ["Eastern", "The Eastern - GA", "The Eastern - Atlanta"]},
+    "terminal-west": {"name": "Terminal West", "aliases": ["Terminal West at King Plow"]},
+    "variety-playhouse": {"name": "Variety Playhouse", "aliases": ["Variety"]},
+    "tabernacle": {"name": "Tabernacle", "aliases": ["The Tabernacle", "Tabernacle - Atlanta"]},
+    "fox-theatre": {"name": "Fox Theatre", "aliases": ["Fox Theatre - Atlanta", "The Fox Theatre", "Fox Theater"]},
+    "buckhead-theatre": {"name": "Buckhead Theatre", "aliases": ["Buckhead Theater"]},
+    "aisle-5": {"name": "Aisle 5", "aliases": ["Aisle5"]},
+}
+
+FUZZY_CUTOFF = 0.88
+
+
+def _norm(name):
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9&]+', ' ', (name or '').lower())).strip()
+
+
+# Exact alias index: normalized spelling -> canonical ID
+_EXACT = {}
+for _key, _venue in VENUES.items():
+    for _alias in [_venue["name"], *_venue.get("aliases", [])]:
+        _EXACT[_norm(_alias)] = _key
+_CONTAINS = [(_norm(s), k) for k, v in VENUES.items() for s in v.get("contains", [])]
+
+
+@lru_cache(maxsize=4096)
+def canonical_key(venue_name):
+    norm = _norm(venue_name)
+    if norm in _EXACT:
+        return _EXACT[norm]
+    for needle, key in _CONTAINS:
+        if needle in norm:
+            return key
+    # Typos and small variations of a known spelling ("Terminal Wset")
+    close = difflib.get_close_matches(norm, _EXACT.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    if close:
+        return _EXACT[close[0]]
+    return venue_key(venue_name)
+
+
+def display_name(key, fallback=None):
+    venue = VENUES.get(key)
+    if venue:
+        return venue["name"]
+    return (fallback or key).strip()